@@ -0,0 +1,138 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from lazy import LazyThread
+from metrics import registry, time_stage
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = registry.histogram('scalpsmart_inference_batch_size', 'Images per YOLO forward pass.',
+                                buckets=(1, 2, 4, 8, 16, 32))
+
+
+def load_image(file_path):
+    """Decode an image file into the BGR array layout YOLO expects."""
+    import numpy as np
+    from PIL import Image
+
+    with time_stage('decode'), Image.open(file_path) as image:
+        rgb = np.asarray(image.convert('RGB'))
+    return np.ascontiguousarray(rgb[..., ::-1])
+
+
+class BatchScheduler:
+    """Groups concurrent predict requests into one batched YOLO call.
+
+    Requests are queued and a single worker thread drains the queue, flushing a
+    batch once it holds max_batch_size images or the oldest one has waited
+    max_wait_ms. Images are decoded to arrays in the submitting thread because
+    ultralytics only runs a real batched forward pass for in-memory images, a
+    list of file paths is still inferred one at a time.
+    """
+
+    def __init__(self, registry, max_batch_size=8, max_wait_ms=10, enabled=True):
+        self.registry = registry
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.enabled = enabled
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # The YOLO predictor isn't thread-safe, without the scheduler thread
+        # requests take turns on the shared model
+        self._infer_lock = threading.Lock()
+        self._worker = LazyThread(self._run, "batch-scheduler")
+        self._batch_sizes = Counter()
+
+    def submit(self, file_path, timeout=None):
+        """Queue an image for inference and return a Future for its result.
+
+        With batching disabled inference runs right here, timeout then bounds
+        the wait for the model and for other requests using it.
+        """
+        image = load_image(file_path)
+        future = Future()
+
+        if not self.enabled:
+            future.set_running_or_notify_cancel()
+            try:
+                if not self._infer_lock.acquire(timeout=-1 if timeout is None else timeout):
+                    raise TimeoutError("Timed out waiting for the model")
+                try:
+                    result = self._infer([image], timeout)[0]
+                finally:
+                    self._infer_lock.release()
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._worker.ensure_started()
+        self._queue.put((image, future))
+        return future
+
+    def predict(self, file_path, timeout=None):
+        """Return the result for one image, raising TimeoutError after timeout seconds."""
+        future = self.submit(file_path, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Nobody will read the result, drop the image from its batch if
+            # it hasn't started yet instead of adding to the overload
+            future.cancel()
+            # Only a distinct class before Python 3.11
+            raise TimeoutError("Timed out waiting for inference")
+
+    def _infer(self, images, timeout=None):
+        model = self.registry.get(timeout)
+        with time_stage('inference'):
+            results = model(images, verbose=False)
+        BATCH_SIZE.observe(len(images))
+        with self._lock:
+            self._batch_sizes[len(images)] += 1
+        return results
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(image, future) for image, future in self._collect()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self._infer([image for image, _ in batch])
+            except Exception as e:
+                logger.exception("Batched inference failed")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batches": sum(batch_sizes.values()),
+            "batch_sizes": batch_sizes,
+        }
@@ -0,0 +1,68 @@
+"""Compare the old per-request chatbot call with ChatbotClient.
+
+Both talk to the local mock API. "before" is what botResponse() used to do,
+a fresh requests.request() with the payload dict rebuilt each time. "after"
+is ChatbotClient.request() (pooled session, pre-encoded payload) and then
+ChatbotClient.ask() with a repeating prompt mix that hits the cache.
+
+    python bench/bench_chatbot.py --iterations 300 --threads 8 --delay-ms 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chatbot import ChatbotClient  # noqa: E402
+from mock_chatbot import start_mock_chatbot  # noqa: E402
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'chat_bot_dataset.json')
+PROMPTS = ["How long until I see results?", "Is the oil safe for colored hair?",
+           "Do you ship to Canada?", "What is the best shampoo for stage 2?"]
+
+
+def run(label, fn, iterations, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(fn, range(iterations)))
+    rate = iterations / (time.perf_counter() - start)
+    print(f"{label:<28} {rate:>8.0f} req/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--delay-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    server, url = start_mock_chatbot(delay=args.delay_ms / 1000.0)
+    with open(DATASET, encoding='utf-8') as f:
+        dataset = json.load(f)
+
+    def legacy(i):
+        payload = dict(dataset['payload'], question=f"{PROMPTS[i % len(PROMPTS)]} #{i}")
+        response = requests.request("POST", url, json=payload, headers=dataset['headers'])
+        loc = response.text.find("content")
+        return response.text[loc+10:-2]
+
+    client = ChatbotClient.from_dataset(DATASET, url=url)
+
+    run('before (new connection)', legacy, args.iterations, args.threads)
+    run('after (pooled, uncached)', lambda i: client.request(f"{PROMPTS[i % len(PROMPTS)]} #{i}"),
+        args.iterations, args.threads)
+    calls = server.requests
+    run('after (cached prompts)', lambda i: client.ask(PROMPTS[i % len(PROMPTS)]), args.iterations, args.threads)
+    print(f"\nupstream calls for {args.iterations} cached-mix requests: {server.requests - calls}")
+    print(client.stats())
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
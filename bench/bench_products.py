@@ -0,0 +1,104 @@
+"""Compare the product endpoints' database work before and after db.py.
+
+"before" replays what the handlers used to do (a new connection per query and
+one connection and commit per PATCHed field), "after" goes through the pooled
+ProductRepository. Both run against a throwaway copy of data/database.db.
+
+    python bench/bench_products.py --iterations 2000 --threads 4
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from db import Database, ProductRepository, PRODUCT_COLUMNS  # noqa: E402
+
+PATCH = {'NAME': 'Benchmark Shampoo', 'PRICE': '₹ 499', 'BEST_SELLER': 'true'}
+
+
+def legacy_get(path, product_id):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM products WHERE ID = ?', (product_id,))
+    product = cursor.fetchone()
+    conn.close()
+    return dict(zip(PRODUCT_COLUMNS, product))
+
+
+def legacy_list(path):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM products')
+    products = cursor.fetchall()
+    conn.close()
+    return [dict(zip(PRODUCT_COLUMNS, product)) for product in products]
+
+
+def legacy_patch(path, product_id, data):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM products WHERE ID = ?', (product_id,))
+    cursor.fetchone()
+    conn.close()
+    for field in data:
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        cursor.execute(f'UPDATE products SET {field} = ? WHERE ID = ?', (data[field], product_id))
+        conn.commit()
+        conn.close()
+
+
+def run(label, fn, iterations, threads):
+    start = time.perf_counter()
+    if threads == 1:
+        for i in range(iterations):
+            fn(i)
+    else:
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(fn, range(iterations)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {iterations / elapsed:>10.0f} req/s")
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='data/database.db')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'database.db')
+        shutil.copy(args.database, path)
+
+        product_ids = [row[0] for row in sqlite3.connect(path).execute('SELECT ID FROM products')]
+        pick = lambda i: product_ids[i % len(product_ids)]  # noqa: E731
+
+        # Measure "before" first, the repository switches the file to WAL
+        before = {
+            'GET /product/api/<id>': run('before GET one', lambda i: legacy_get(path, pick(i)), args.iterations, args.threads),
+            'GET /product/api/': run('before GET list', lambda i: legacy_list(path), args.iterations, args.threads),
+            'PATCH /product/api/<id>': run('before PATCH', lambda i: legacy_patch(path, pick(i), PATCH), args.iterations, args.threads),
+        }
+
+        products = ProductRepository(Database(path))
+        after = {
+            'GET /product/api/<id>': run('after GET one', lambda i: products.get(pick(i)), args.iterations, args.threads),
+            'GET /product/api/': run('after GET list', lambda i: products.list(), args.iterations, args.threads),
+            'PATCH /product/api/<id>': run('after PATCH', lambda i: products.update(pick(i), PATCH), args.iterations, args.threads),
+        }
+
+    print()
+    for route in before:
+        print(f"{route:<24} {before[route]:>8.0f} -> {after[route]:>8.0f} req/s ({after[route] / before[route]:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
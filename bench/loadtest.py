@@ -0,0 +1,396 @@
+"""Load test the whole server, route by route.
+
+Starts the app in a subprocess, either Flask's threaded server or gunicorn
+with wsgi.py and gunicorn.conf.py, against throwaway databases seeded with
+--products products and --users users with --history result images each.
+YOLO is replaced by the stub in bench/stub_ultralytics and the chatbot API by
+bench/mock_chatbot.py. Each route is then driven by --concurrency clients for
+--requests requests and throughput, p50/p95/p99 latency, errors and the
+server's peak RSS during that route are reported. For gunicorn the peak is
+the largest of the workers'.
+
+    python bench/loadtest.py --concurrency 16 --requests 400
+    python bench/loadtest.py --server gunicorn --workers 2 --routes upload,predict,images
+    python bench/loadtest.py --products 20000 --users 20 --history 1000 --json results.json
+
+Routes run in the order given. predict uses the uploads made by upload and
+product_delete the products made by product_create, so keep those pairs in
+order. images_all returns the full legacy history with every image inlined
+and isn't run unless asked for.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import numpy as np
+import requests
+from PIL import Image
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH)
+sys.path.insert(0, ROOT)
+
+from blob_store import BlobStore  # noqa: E402
+from db import Database, ProductRepository, UploadRepository, UserImageRepository  # noqa: E402
+from faq import load_faq  # noqa: E402
+from mock_chatbot import start_mock_chatbot  # noqa: E402
+
+DATASET = os.path.join(ROOT, 'chat_bot_dataset.json')
+STAGES = ('bald', 'normal', 'stage 1', 'stage 2', 'stage 3')
+CATEGORIES = ('Shampoo', 'Conditioner', 'Hair Oil', 'Serum', 'Supplement', 'Hair Mask')
+BRANDS = ('Mamaearth', 'Indulekha', 'WOW', 'Biotique', 'Himalaya', 'Minimalist', 'Plum', 'Kama')
+WORDS = ('onion', 'argan', 'keratin', 'biotin', 'rosemary', 'bhringraj', 'tea tree', 'coconut',
+         'anti-dandruff', 'hair fall', 'volumizing', 'repair', 'scalp', 'growth', 'redensyl')
+
+DEFAULT_ROUTES = ('upload', 'predict', 'images', 'images_meta', 'progress', 'product_get', 'product_list',
+                  'product_search', 'product_create', 'product_update', 'product_delete', 'chatbot')
+
+
+def make_image(seed, size=(960, 720)):
+    """A photo-sized JPEG with smooth random content, different for every seed."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize(size, Image.BICUBIC)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def seed_databases(workdir, product_count, user_count, history_count):
+    """Create the databases and blob store the server will use, returns the product ids."""
+    products_path = os.path.join(workdir, 'database.db')
+    shutil.copyfile(os.path.join(ROOT, 'data', 'database.db'), products_path)
+    products_db = Database(products_path)
+    products = ProductRepository(products_db)
+    products.init_schema()
+    rng = random.Random(0)
+    rows = []
+    for i in range(product_count):
+        words = rng.sample(WORDS, 3)
+        rows.append((f"{rng.choice(BRANDS)} {words[0].title()} {rng.choice(CATEGORIES)} #{i}",
+                     f"₹ {rng.randint(99, 2499)}", f"https://example.com/images/{i}.jpg",
+                     f"{words[1].title()} {words[2]} formula for {rng.choice(STAGES)} hair loss.",
+                     rng.choice(BRANDS), f"Reduces hair fall, {words[1]} and {words[2]} nourish the scalp.",
+                     f"https://example.com/products/{i}", rng.choice(CATEGORIES),
+                     'true' if rng.random() < 0.1 else 'false'))
+    with products_db.transaction(write=True) as conn:
+        conn.executemany(ProductRepository.INSERT, rows)
+        # The copied catalogue has gaps in its ids, only existing ones are requested
+        product_ids = [row[0] for row in conn.execute("SELECT ID FROM products ORDER BY ID")]
+    products_db.close()
+
+    # History rows share a handful of result images, like the real blobs they are PNGs
+    blob_store = BlobStore(os.path.join(workdir, 'blobs'))
+    keys = []
+    for i in range(8):
+        with Image.open(BytesIO(make_image(10_000 + i, (640, 480)))) as image:
+            buffer = BytesIO()
+            image.save(buffer, format='PNG')
+        data = buffer.getvalue()
+        keys.append((blob_store.put(data, 'png'), len(data)))
+
+    images_db = Database(os.path.join(workdir, 'user_images.db'))
+    UserImageRepository(images_db).init_schema()
+    UploadRepository(images_db).init_schema()
+    start = datetime.now() - timedelta(days=history_count)
+    with images_db.transaction(write=True) as conn:
+        for user in range(user_count):
+            rows = []
+            for i in range(history_count):
+                key, size = keys[(user + i) % len(keys)]
+                upload_time = start + timedelta(days=i, minutes=rng.randint(0, 600))
+                rows.append((f"bench-{user}", key, size, upload_time, rng.choice(STAGES)))
+            conn.executemany("""
+                INSERT INTO user_images (user_id, image_data, image_key, image_size, upload_time, stage)
+                VALUES (?, '', ?, ?, ?, ?)
+            """, rows)
+    images_db.close()
+    return product_ids
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir, chatbot_url, port):
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join([os.path.join(BENCH, 'stub_ultralytics'), ROOT]),
+               PRODUCTS_DB=os.path.join(workdir, 'database.db'),
+               USER_IMAGES_DB=os.path.join(workdir, 'user_images.db'),
+               BLOB_FOLDER=os.path.join(workdir, 'blobs'),
+               MODEL_PATH=os.path.join(workdir, 'stub.pt'),
+               CHATBOT_DATASET=DATASET,
+               CHATBOT_URL=chatbot_url,
+               STUB_YOLO_MS=str(args.inference_ms))
+    open(env['MODEL_PATH'], 'wb').close()
+
+    if args.server == 'gunicorn':
+        env.update(GUNICORN_WORKERS=str(args.workers), GUNICORN_THREADS=str(args.threads))
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+                   '-b', f'127.0.0.1:{port}', 'wsgi:app']
+    else:
+        command = [sys.executable, '-c',
+                   f"from wsgi import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    # ./uploads and ./Results are relative to the working directory
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if requests.get(url + '/ready', timeout=1).ok:
+                return process, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    with open(log.name, errors='replace') as f:
+        sys.exit(f"Server didn't start:\n{f.read()[-4000:]}")
+
+
+def server_pids(process):
+    """The server process and all its descendants (gunicorn workers)."""
+    pids = [process.pid]
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/task/{pid}/children') as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def reset_peak_rss(pids):
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux only)
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/clear_refs', 'w') as f:
+                f.write('5')
+        except OSError:
+            pass
+
+
+def peak_rss_mb(pids):
+    peak = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        peak = max(peak, int(line.split()[1]))
+        except OSError:
+            pass
+    return peak / 1024.0 if peak else None
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100.0))]
+
+
+class Scenarios:
+    """One method per route, each makes request i with the given session."""
+
+    def __init__(self, url, workdir, users, product_ids, seed_images):
+        self.url = url
+        self.workdir = workdir
+        self.users = users
+        # A fixed shuffle, request i always hits the same product whatever the concurrency
+        self.product_ids = random.Random(0).sample(product_ids, len(product_ids))
+        self.seed_images = seed_images
+        self.uploads = []
+        self.created = []
+        self.faq = [question for question, _ in load_faq(DATASET)]
+
+    def user(self, i):
+        return f"bench-{i % self.users}"
+
+    def upload(self, session, i):
+        image = self.seed_images[i % len(self.seed_images)]
+        response = session.post(f"{self.url}/flutter/upload", params={'user_id': self.user(i)},
+                                files={'image': (f'{i}.jpg', image, 'image/jpeg')})
+        if response.ok:
+            self.uploads.append((self.user(i), response.json()['upload_id']))
+        return response
+
+    def predict(self, session, i):
+        user_id, upload_id = self.uploads[i % len(self.uploads)]
+        return session.get(f"{self.url}/flutter/predict", params={'user_id': user_id, 'upload_id': upload_id})
+
+    def images(self, session, i):
+        return session.get(f"{self.url}/api/images/{self.user(i)}", params={'limit': 20})
+
+    def images_meta(self, session, i):
+        return session.get(f"{self.url}/api/images/{self.user(i)}", params={'limit': 100, 'fields': 'meta'})
+
+    def images_all(self, session, i):
+        return session.get(f"{self.url}/api/images/{self.user(i)}")
+
+    def progress(self, session, i):
+        return session.get(f"{self.url}/api/progress/{self.user(i)}")
+
+    def product_get(self, session, i):
+        return session.get(f"{self.url}/product/api/{self.product_ids[i % len(self.product_ids)]}")
+
+    def product_list(self, session, i):
+        return session.get(f"{self.url}/product/api/")
+
+    def product_search(self, session, i):
+        return session.get(f"{self.url}/product/api/", params={'q': WORDS[i % len(WORDS)].split()[0],
+                                                               'sort': '-price', 'limit': 20})
+
+    def product_create(self, session, i):
+        return session.post(f"{self.url}/product/api/", json={
+            'NAME': f"Load test product {i}", 'PRICE': f"₹ {100 + i}", 'IMAGE': '', 'DESCRIPTION': 'Created by loadtest',
+            'BRAND': BRANDS[i % len(BRANDS)], 'BENEFITS': '', 'URL': '', 'CATEGORY': CATEGORIES[i % len(CATEGORIES)],
+            'BEST_SELLER': 'false'})
+
+    def product_update(self, session, i):
+        return session.patch(f"{self.url}/product/api/{self.product_ids[i % len(self.product_ids)]}",
+                             json={'PRICE': f"₹ {random.Random(i).randint(99, 2499)}", 'BEST_SELLER': 'true'})
+
+    def product_delete(self, session, i):
+        if not self.created:
+            # The ids of the products made by product_create are only known from the database
+            with Database(os.path.join(self.workdir, 'database.db')).transaction() as conn:
+                self.created = [row[0] for row in conn.execute(
+                    "SELECT ID FROM products WHERE DESCRIPTION = 'Created by loadtest' ORDER BY ID")]
+        return session.delete(f"{self.url}/product/api/{self.created[i % len(self.created)] if self.created else 0}")
+
+    def chatbot(self, session, i):
+        # A quarter of the prompts are FAQ questions answered locally, the rest reach the mock API
+        if i % 4 == 0 and self.faq:
+            prompt = self.faq[i // 4 % len(self.faq)]
+        else:
+            prompt = f"What should I use for {WORDS[i % len(WORDS)]} hair care, question {i}?"
+        return session.post(f"{self.url}/flutter/chatbot/prompt", json={'prompt': prompt})
+
+
+def drive(name, fn, count, concurrency, pids):
+    local = threading.local()
+    latencies = []
+    errors = []
+
+    def one(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = fn(session, i)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(i)
+
+    reset_peak_rss(pids)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(one, range(count)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "route": name,
+        "requests": count,
+        "errors": len(errors),
+        "seconds": round(seconds, 3),
+        "rps": round(count / seconds, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": peak_rss_mb(pids[1:] or pids),
+    }
+
+
+def print_result(result):
+    rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] else '-'
+    print(f"{result['route']:<16} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+          f"{result['p99_ms']:>9.1f} {result['errors']:>7} {rss:>9}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('flask', 'gunicorn'), default='flask')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers.')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker.')
+    parser.add_argument('--routes', default=','.join(DEFAULT_ROUTES),
+                        help=f"Comma separated, any of {', '.join(DEFAULT_ROUTES + ('images_all',))}.")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route.')
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--history', type=int, default=300, help='History rows per user.')
+    parser.add_argument('--images', type=int, default=50,
+                        help='Distinct images to upload, repeats are deduplicated and predicted from the cache.')
+    parser.add_argument('--inference-ms', type=float, default=40, help='Stub YOLO time per batch.')
+    parser.add_argument('--chatbot-delay-ms', type=float, default=300, help='Mock chatbot API latency.')
+    parser.add_argument('--json', help='Also write the results to this file.')
+    parser.add_argument('--keep', action='store_true', help="Keep the working directory and server.log.")
+    args = parser.parse_args()
+
+    routes = [route.strip() for route in args.routes.split(',') if route.strip()]
+    unknown = set(routes) - set(DEFAULT_ROUTES + ('images_all',))
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix='scalpsmart-loadtest-')
+    print(f"Seeding {args.products} products and {args.users} users x {args.history} history rows in {workdir}",
+          flush=True)
+    start = time.perf_counter()
+    product_ids = seed_databases(workdir, args.products, args.users, args.history)
+    seed_images = [make_image(i) for i in range(args.images)]
+    print(f"Seeded in {time.perf_counter() - start:.1f}s", flush=True)
+
+    mock, chatbot_url = start_mock_chatbot(delay=args.chatbot_delay_ms / 1000.0)
+    process, url = start_server(args, workdir, chatbot_url, free_port())
+    results = []
+    try:
+        pids = server_pids(process)
+        print(f"{args.server} server on {url}, pids {pids}, concurrency {args.concurrency}, "
+              f"{args.requests} requests per route\n", flush=True)
+        print(f"{'route':<16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'peak MB':>9}")
+
+        scenarios = Scenarios(url, workdir, args.users, product_ids, seed_images)
+        for route in routes:
+            if route == 'predict' and not scenarios.uploads:
+                # predict needs uploads to work on
+                drive('upload', scenarios.upload, min(args.requests, args.images), args.concurrency, pids)
+            result = drive(route, getattr(scenarios, route), args.requests, args.concurrency, pids)
+            results.append(result)
+            print_result(result)
+    finally:
+        process.terminate()
+        process.wait(10)
+        mock.shutdown()
+        if args.keep:
+            print(f"\nKept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Local stand-in for the remote chatbot API.
+
+Answers every POST with {"content": ...} after a configurable delay, so the
+chatbot client and routes can be tested and benchmarked offline. Requests
+with "stream_data": true get the answer word by word as "data:" lines
+instead. Point the server at it with CHATBOT_URL=http://127.0.0.1:<port>/.
+
+    python bench/mock_chatbot.py --port 8765 --delay-ms 800
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockChatbotHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, without this keep-alive
+    # clients stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+
+        answer = f"Mock answer to: {payload.get('question', '')}"
+        if payload.get('stream_data'):
+            self.stream_answer(answer)
+            return
+
+        body = json.dumps({
+            "content": answer,
+            "processing_time": self.server.delay * 1000,
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_answer(self, answer):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        words = answer.split(' ')
+        try:
+            for i, word in enumerate(words):
+                chunk = word if i == 0 else ' ' + word
+                self.write_chunk(f"data: {json.dumps({'content': chunk})}\n\n".encode('utf-8'))
+                time.sleep(self.server.chunk_delay)
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            self.server.cancelled += 1
+            self.close_connection = True
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_mock_chatbot(port=0, delay=0.0, chunk_delay=0.0):
+    """Start the mock in a background thread, returns (server, url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockChatbotHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.chunk_delay = chunk_delay
+    server.requests = 0
+    server.cancelled = 0
+    threading.Thread(target=server.serve_forever, name="mock-chatbot", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay-ms', type=float, default=0, help='Delay before the answer (or its first chunk).')
+    parser.add_argument('--chunk-delay-ms', type=float, default=0, help='Delay between streamed chunks.')
+    args = parser.parse_args()
+
+    server, url = start_mock_chatbot(args.port, args.delay_ms / 1000.0, args.chunk_delay_ms / 1000.0)
+    print(f"Mock chatbot API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
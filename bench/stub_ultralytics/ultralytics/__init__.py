@@ -0,0 +1,66 @@
+"""Stand-in for the ultralytics package, used by bench/loadtest.py.
+
+YOLO() loads nothing and calling it sleeps for STUB_YOLO_MS per batch (plus
+STUB_YOLO_IMAGE_MS per image) instead of running a network, so the server
+can be load tested without torch or the real weights. Results have the
+attributes server.py reads: boxes.cls/conf/xyxy and plot().
+"""
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+LOAD_SECONDS = float(os.environ.get('STUB_YOLO_LOAD_MS', 200)) / 1000.0
+BATCH_SECONDS = float(os.environ.get('STUB_YOLO_MS', 40)) / 1000.0
+IMAGE_SECONDS = float(os.environ.get('STUB_YOLO_IMAGE_MS', 5)) / 1000.0
+
+
+class Boxes:
+    def __init__(self, class_id, confidence, box):
+        self.cls = np.array([float(class_id)])
+        self.conf = np.array([confidence])
+        self.xyxy = np.array([box], dtype=float)
+
+    def __len__(self):
+        return 1
+
+    def __getitem__(self, index):
+        return self
+
+
+class Results:
+    def __init__(self, image):
+        self.orig_img = image
+        height, width = image.shape[:2]
+        # Deterministic per image, so cached and fresh predictions agree
+        class_id = int(image[::16, ::16].sum()) % 5
+        self.boxes = Boxes(class_id, 0.5 + class_id / 10.0, [width * 0.2, height * 0.2, width * 0.8, height * 0.8])
+
+    def plot(self):
+        image = self.orig_img.copy()
+        height, width = image.shape[:2]
+        top, left, bottom, right = height // 5, width // 5, height * 4 // 5, width * 4 // 5
+        image[top:bottom, [left, right - 1]] = (0, 255, 0)
+        image[[top, bottom - 1], left:right] = (0, 255, 0)
+        return image
+
+
+def _load(source):
+    if isinstance(source, np.ndarray):
+        return source
+    with Image.open(source) as image:
+        return np.ascontiguousarray(np.asarray(image.convert('RGB'))[..., ::-1])
+
+
+class YOLO:
+    def __init__(self, model_path):
+        self.model_path = model_path
+        time.sleep(LOAD_SECONDS)
+
+    def __call__(self, source, **kwargs):
+        images = [_load(item) for item in (source if isinstance(source, list) else [source])]
+        time.sleep(BATCH_SECONDS + IMAGE_SECONDS * len(images))
+        return [Results(image) for image in images]
+
+    predict = __call__
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from metrics import time_stage
+
+# <sha256>.<ext>, anything else is rejected before it touches the filesystem
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+
+
+class BlobStore:
+    """Content-addressed file store for result images.
+
+    Each blob is written once under <root>/<first two hex chars>/<key>, where
+    the key is the SHA-256 of its content plus an extension. Writing the same
+    content twice is a no-op, so blobs never change once written and can be
+    cached forever by clients.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def is_valid_key(key):
+        return bool(KEY_PATTERN.match(key or ''))
+
+    def path(self, key):
+        if not self.is_valid_key(key):
+            raise ValueError(f"Invalid blob key: {key!r}")
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key):
+        return self.is_valid_key(key) and os.path.exists(self.path(key))
+
+    def put(self, data, ext='png'):
+        key = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+        path = self.path(key)
+        if os.path.exists(path):
+            return key
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with time_stage('blob_write'), os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key
+
+    def read(self, key):
+        with open(self.path(key), 'rb') as f:
+            return f.read()
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CatalogCache:
+    """Pre-serialized JSON responses for the product catalog.
+
+    Entries are keyed by what was asked for (the full list, one product, ...)
+    and hold the encoded body with its ETag. Every lookup compares the
+    catalog_version row, which triggers bump on each write to products, with
+    the version the entries were built from, so a write made by any worker
+    invalidates the cache in all of them. Writes in this worker also call
+    invalidate() directly.
+    """
+
+    def __init__(self, products, dumps, max_entries=256):
+        self.products = products
+        self.dumps = dumps
+        self.max_entries = max_entries
+
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        """Return (body, etag) for key, calling load() on a miss.
+
+        Returns None if load() returns None, which is not cached.
+        """
+        # Read the version and the data in one transaction so an entry is
+        # never stored under a version it doesn't match
+        with self.products.db.transaction():
+            version = self.products.version()
+            with self._lock:
+                if version != self._version:
+                    self._entries.clear()
+                    self._version = version
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+
+            value = load()
+
+        if value is None:
+            return None
+
+        body = self.dumps(value).encode('utf-8')
+        entry = (body, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,260 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from metrics import observe_stage, time_stage
+
+DEFAULT_URL = "https://api.worqhat.com/api/ai/content/v2"
+
+
+def normalize_prompt(prompt):
+    """Cache key for a prompt, ignoring case, punctuation and extra whitespace."""
+    return ' '.join(re.findall(r'\w+', prompt.lower()))
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_size=512, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ChatbotClient:
+    """Client for the remote chatbot API.
+
+    Keeps a pooled keep-alive session with timeouts and retries, serializes
+    the large constant part of the payload once, caches answers per
+    normalized prompt and lets concurrent identical prompts share a single
+    upstream call.
+    """
+
+    def __init__(self, payload, headers, url=DEFAULT_URL, connect_timeout=3.05, read_timeout=30,
+                 retries=2, pool_size=10, cache_size=512, cache_ttl=3600):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.headers = headers
+        self.retries = retries
+        self.pool_size = pool_size
+        self._session = None
+
+        # Everything but the question is the same for every request, so it is
+        # encoded once and the question is spliced in at the end
+        self._template = {key: value for key, value in payload.items() if key != 'question'}
+        self._payload_prefix = self._encode_prefix(self._template)
+        self._stream_payload_prefix = self._encode_prefix(dict(self._template, stream_data=True))
+
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.streams = 0
+        self.aborted_streams = 0
+        # Time to first streamed chunk for the most recent streams
+        self.stream_ttfb = deque(maxlen=1000)
+
+    @property
+    def session(self):
+        # requests is only imported once the first prompt needs the API
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.headers['Content-Type'] = 'application/json'
+        retry = Retry(total=self.retries, connect=self.retries, read=0, backoff_factor=0.3,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset(['POST']))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @classmethod
+    def from_dataset(cls, path, **kwargs):
+        """Build a client from the payload and headers in chat_bot_dataset.json."""
+        with open(path, encoding='utf-8') as f:
+            dataset = json.load(f)
+        return cls(dataset['payload'], dataset['headers'], **kwargs)
+
+    @staticmethod
+    def _encode_prefix(template):
+        encoded = json.dumps(template)
+        return encoded[:-1] + (', ' if template else '') + '"question": '
+
+    def encode_payload(self, prompt, stream=False):
+        prefix = self._stream_payload_prefix if stream else self._payload_prefix
+        return (prefix + json.dumps(prompt) + '}').encode('utf-8')
+
+    @staticmethod
+    def parse_content(response):
+        try:
+            return response.json()['content']
+        except (ValueError, KeyError, TypeError):
+            # Same slicing the server used before, for replies that aren't the expected JSON
+            loc = response.text.find("content")
+            return response.text[loc+10:-2]
+
+    def request(self, prompt):
+        """Call the API without going through the cache."""
+        with self._lock:
+            self.upstream_calls += 1
+        with time_stage('chatbot_upstream'):
+            response = self.session.post(self.url, data=self.encode_payload(prompt), timeout=self.timeout)
+            response.raise_for_status()
+        return self.parse_content(response)
+
+    def ask(self, prompt, on_upstream=None):
+        """Answer from the cache, a concurrent identical request or the API.
+
+        on_upstream(seconds) is called only when this call went to the API.
+        """
+        key = normalize_prompt(prompt)
+        answer = self.cache.get(key)
+        if answer is not None:
+            return answer
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            start = time.perf_counter()
+            answer = self.request(prompt)
+            if on_upstream is not None:
+                on_upstream(time.perf_counter() - start)
+            self.cache.put(key, answer)
+            future.set_result(answer)
+            return answer
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def __call__(self, prompt):
+        return self.ask(prompt)
+
+    @staticmethod
+    def parse_stream_line(line):
+        """Text carried by one line of the upstream stream, None for keep-alives and the end marker."""
+        if line.startswith('data:'):
+            line = line[5:].strip()
+        if not line or line.startswith(':') or line == '[DONE]':
+            return None
+        try:
+            chunk = json.loads(line)
+        except ValueError:
+            return line
+        if isinstance(chunk, dict):
+            return chunk.get('content')
+        return chunk if isinstance(chunk, str) else None
+
+    def stream(self, prompt, on_upstream=None):
+        """Yield the answer in chunks as the API produces them.
+
+        Cached answers are yielded in one piece. Closing the generator (as
+        happens when the client disconnects) closes the upstream connection.
+        The complete answer is cached once the stream finishes, and only then
+        is on_upstream(seconds) called.
+        """
+        key = normalize_prompt(prompt)
+        answer = self.cache.get(key)
+        if answer is not None:
+            yield answer
+            return
+
+        start = time.perf_counter()
+        with self._lock:
+            self.upstream_calls += 1
+            self.streams += 1
+        response = self.session.post(self.url, data=self.encode_payload(prompt, stream=True),
+                                     timeout=self.timeout, stream=True)
+        chunks = []
+        completed = False
+        try:
+            response.raise_for_status()
+            # chunk_size=None hands over each transfer-encoding chunk as soon as
+            # it arrives instead of waiting for a fixed number of bytes
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                text = self.parse_stream_line(line or '')
+                if not text:
+                    continue
+                if not chunks:
+                    self.stream_ttfb.append(time.perf_counter() - start)
+                    observe_stage('chatbot_stream_first_chunk', self.stream_ttfb[-1])
+                chunks.append(text)
+                yield text
+            completed = True
+        finally:
+            response.close()
+            if completed:
+                self.cache.put(key, ''.join(chunks))
+                if on_upstream is not None:
+                    on_upstream(time.perf_counter() - start)
+            else:
+                with self._lock:
+                    self.aborted_streams += 1
+
+    def stats(self):
+        ttfb = sorted(self.stream_ttfb)
+        with self._lock:
+            return {
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+                "cache_entries": len(self.cache),
+                "cache_hits": self.cache.hits,
+                "cache_misses": self.cache.misses,
+                "streams": self.streams,
+                "aborted_streams": self.aborted_streams,
+                "stream_ttfb_p50_seconds": ttfb[len(ttfb) // 2] if ttfb else None,
+                "stream_ttfb_p95_seconds": ttfb[int(len(ttfb) * 0.95)] if ttfb else None,
+            }
@@ -0,0 +1,586 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import observe_stage
+
+# Applied to every new connection. WAL lets readers run while a write is in
+# progress, and synchronous=NORMAL is durable enough in WAL mode without an
+# fsync per commit.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+PRODUCT_FIELDS = ('NAME', 'PRICE', 'IMAGE', 'DESCRIPTION', 'BRAND', 'BENEFITS', 'URL', 'CATEGORY', 'BEST_SELLER')
+PRODUCT_COLUMNS = ('ID',) + PRODUCT_FIELDS
+PRODUCT_SEARCH_FIELDS = ('NAME', 'DESCRIPTION', 'BENEFITS')
+
+# Most points kept in a user's progress timeline, see fold_progress()
+PROGRESS_TIMELINE_SIZE = 16
+
+# Accepted ?sort= values for product searches
+PRODUCT_SORTS = {
+    'id': 'p.ID',
+    'price': 'p.PRICE_VALUE, p.ID',
+    '-price': 'p.PRICE_VALUE DESC, p.ID',
+    'name': 'p.NAME COLLATE NOCASE, p.ID',
+    '-name': 'p.NAME COLLATE NOCASE DESC, p.ID',
+    'relevance': 'f.rank, p.ID',
+}
+
+
+class Database:
+    """One SQLite file with a connection per thread, reused across requests.
+
+    Connections run in autocommit mode and transaction() issues BEGIN/COMMIT
+    explicitly. Nested transaction() blocks join the outer transaction, so a
+    request handler can wrap several repository calls in one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        local = self._local
+        # A connection must not be shared with a forked child, so a preloaded
+        # app opens new ones in each worker
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=256)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            local.conn = conn
+            local.pid = os.getpid()
+            local.depth = 0
+        return local.conn
+
+    @contextmanager
+    def transaction(self, write=False):
+        conn = self.connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        # Writers take the lock up front instead of upgrading a read lock,
+        # which can fail with SQLITE_BUSY regardless of busy_timeout
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            local.depth = 0
+            observe_stage('sqlite_write' if write else 'sqlite_read', time.perf_counter() - start)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+class ProductRepository:
+    SELECT_ONE = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE ID = ?"
+    SELECT_ALL = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products"
+    INSERT = (f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}) "
+              f"VALUES ({', '.join('?' for _ in PRODUCT_FIELDS)})")
+    DELETE = "DELETE FROM products WHERE ID = ?"
+
+    def __init__(self, db):
+        self.db = db
+
+    def init_schema(self):
+        with self.db.transaction(write=True) as conn:
+            # Bumped by triggers on every write to products, whoever makes it,
+            # so each worker can tell whether its cached catalog is stale
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_version (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    version INTEGER NOT NULL
+                )
+            """)
+            conn.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS products_version_{event.lower()}
+                    AFTER {event} ON products
+                    BEGIN
+                        UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+                    END
+                """)
+
+            # PRICE is stored as text like "₹ 999", this exposes it as a number
+            # that can be filtered, sorted and indexed
+            columns = {row[1] for row in conn.execute('PRAGMA table_xinfo(products)')}
+            if 'PRICE_VALUE' not in columns:
+                conn.execute("""
+                    ALTER TABLE products ADD COLUMN PRICE_VALUE REAL GENERATED ALWAYS AS
+                    (CAST(REPLACE(REPLACE(REPLACE(PRICE, '₹', ''), ',', ''), ' ', '') AS REAL)) VIRTUAL
+                """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_category ON products (CATEGORY COLLATE NOCASE)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_brand ON products (BRAND COLLATE NOCASE)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_best_seller ON products (BEST_SELLER)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_products_price ON products (PRICE_VALUE)")
+
+            # Full-text index over the descriptive columns, kept in sync by triggers
+            has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'").fetchone()
+            if not has_fts:
+                conn.execute(f"""
+                    CREATE VIRTUAL TABLE products_fts USING fts5(
+                        {', '.join(PRODUCT_SEARCH_FIELDS)},
+                        content='products', content_rowid='ID', tokenize='porter unicode61'
+                    )
+                """)
+                conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+            fields = ', '.join(PRODUCT_SEARCH_FIELDS)
+            new_values = ', '.join(f'new.{field}' for field in PRODUCT_SEARCH_FIELDS)
+            old_values = ', '.join(f'old.{field}' for field in PRODUCT_SEARCH_FIELDS)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                    INSERT INTO products_fts (rowid, {fields}) VALUES (new.ID, {new_values});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                    INSERT INTO products_fts (products_fts, rowid, {fields}) VALUES ('delete', old.ID, {old_values});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF {fields} ON products BEGIN
+                    INSERT INTO products_fts (products_fts, rowid, {fields}) VALUES ('delete', old.ID, {old_values});
+                    INSERT INTO products_fts (rowid, {fields}) VALUES (new.ID, {new_values});
+                END
+            """)
+
+    def version(self):
+        with self.db.transaction() as conn:
+            return conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+
+    def get(self, product_id):
+        with self.db.transaction() as conn:
+            row = conn.execute(self.SELECT_ONE, (product_id,)).fetchone()
+        return dict(zip(PRODUCT_COLUMNS, row)) if row else None
+
+    def list(self):
+        with self.db.transaction() as conn:
+            rows = conn.execute(self.SELECT_ALL).fetchall()
+        return [dict(zip(PRODUCT_COLUMNS, row)) for row in rows]
+
+    def search(self, q=None, category=None, brand=None, best_seller=None,
+               min_price=None, max_price=None, sort=None, limit=None, offset=0):
+        """Filtered, sorted page of products.
+
+        q is matched against NAME, DESCRIPTION and BENEFITS, every word has to
+        appear (as a prefix). sort is one of PRODUCT_SORTS and defaults to
+        relevance when q is given, ID otherwise.
+        """
+        columns = ', '.join(f'p.{column}' for column in PRODUCT_COLUMNS)
+        query = f"SELECT {columns} FROM products p"
+        where = []
+        params = []
+
+        terms = re.findall(r'\w+', q or '')
+        if terms:
+            query += " JOIN products_fts f ON f.rowid = p.ID"
+            where.append("products_fts MATCH ?")
+            params.append(' '.join(f'"{term}"*' for term in terms))
+        if category is not None:
+            where.append("p.CATEGORY = ? COLLATE NOCASE")
+            params.append(category)
+        if brand is not None:
+            where.append("p.BRAND = ? COLLATE NOCASE")
+            params.append(brand)
+        if best_seller is not None:
+            where.append("p.BEST_SELLER = ?")
+            params.append('true' if best_seller else 'false')
+        if min_price is not None:
+            where.append("p.PRICE_VALUE >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            where.append("p.PRICE_VALUE <= ?")
+            params.append(max_price)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+
+        sort = sort or ('relevance' if terms else 'id')
+        if sort == 'relevance' and not terms:
+            sort = 'id'
+        query += " ORDER BY " + PRODUCT_SORTS[sort]
+
+        if limit is not None or offset:
+            query += " LIMIT ? OFFSET ?"
+            params.extend((-1 if limit is None else limit, offset))
+
+        with self.db.transaction() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(zip(PRODUCT_COLUMNS, row)) for row in rows]
+
+    def create(self, data):
+        with self.db.transaction(write=True) as conn:
+            cursor = conn.execute(self.INSERT, tuple(data.get(field) for field in PRODUCT_FIELDS))
+        return cursor.lastrowid
+
+    def update(self, product_id, data):
+        """Update the given fields in one statement, returns False if the product doesn't exist."""
+        fields = [field for field in PRODUCT_FIELDS if field in data]
+        with self.db.transaction(write=True) as conn:
+            if not fields:
+                return conn.execute("SELECT 1 FROM products WHERE ID = ?", (product_id,)).fetchone() is not None
+            assignments = ', '.join(f'{field} = ?' for field in fields)
+            cursor = conn.execute(f'UPDATE products SET {assignments} WHERE ID = ?',
+                                  [data[field] for field in fields] + [product_id])
+        return cursor.rowcount > 0
+
+    def delete(self, product_id):
+        with self.db.transaction(write=True) as conn:
+            cursor = conn.execute(self.DELETE, (product_id,))
+        return cursor.rowcount > 0
+
+
+def fold_progress(progress, upload_time, stage):
+    """Add one scan to a progress summary in place.
+
+    The timeline keeps every timeline_step-th scan. When it grows past
+    PROGRESS_TIMELINE_SIZE points every other point is dropped and the step
+    doubles, so it stays evenly spread over the whole history. Rows saved
+    without a stage count as scans but are left out of stage_counts and
+    latest_stage.
+    """
+    scan_time = str(upload_time)[:19]
+    if progress['scans'] % progress['timeline_step'] == 0:
+        progress['timeline'].append([scan_time, stage])
+        if len(progress['timeline']) > PROGRESS_TIMELINE_SIZE:
+            progress['timeline'] = progress['timeline'][::2]
+            progress['timeline_step'] *= 2
+    progress['scans'] += 1
+    if stage is not None:
+        progress['stage_counts'][stage] = progress['stage_counts'].get(stage, 0) + 1
+        progress['latest_stage'] = stage
+    progress['first_scan'] = progress['first_scan'] or scan_time
+    progress['last_scan'] = scan_time
+    return progress
+
+
+def empty_progress():
+    return {'scans': 0, 'latest_stage': None, 'first_scan': None, 'last_scan': None,
+            'stage_counts': {}, 'timeline': [], 'timeline_step': 1}
+
+
+class UserImageRepository:
+    def __init__(self, db):
+        self.db = db
+
+    def init_schema(self):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_images (
+                    image_id INTEGER PRIMARY KEY,
+                    user_id TEXT,
+                    image_data TEXT NOT NULL,
+                    upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    stage TEXT
+                )
+            """)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(user_images)')}
+            if 'image_key' not in columns:
+                conn.execute('ALTER TABLE user_images ADD COLUMN image_key TEXT')
+            if 'image_size' not in columns:
+                conn.execute('ALTER TABLE user_images ADD COLUMN image_size INTEGER')
+            # Serves the per-user history query and its cursor pagination without a sort
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_user_images_user_time
+                ON user_images (user_id, upload_time DESC, image_id DESC)
+            """)
+            # Per-user summary of the history, updated with every new row
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_progress (
+                    user_id TEXT PRIMARY KEY,
+                    scans INTEGER NOT NULL,
+                    latest_stage TEXT,
+                    first_scan TEXT,
+                    last_scan TEXT,
+                    stage_counts TEXT NOT NULL,
+                    timeline TEXT NOT NULL,
+                    timeline_step INTEGER NOT NULL
+                )
+            """)
+
+    def add(self, user_id, image_key, image_size, upload_time, stage):
+        with self.db.transaction(write=True) as conn:
+            # image_data is NOT NULL in the original schema, the image itself is in the blob store
+            cursor = conn.execute("""
+                INSERT INTO user_images (user_id, image_data, image_key, image_size, upload_time, stage)
+                VALUES (?, '', ?, ?, ?, ?)
+            """, (user_id, image_key, image_size, upload_time, stage))
+            progress = self._read_progress(conn, user_id)
+            if progress is None:
+                # No summary yet, older history (if any) is folded in along with this row
+                progress = self._build_progress(conn, user_id)
+            else:
+                fold_progress(progress, upload_time, stage)
+            self._write_progress(conn, user_id, progress)
+        return cursor.lastrowid
+
+    @staticmethod
+    def _read_progress(conn, user_id):
+        row = conn.execute("""
+            SELECT scans, latest_stage, first_scan, last_scan, stage_counts, timeline, timeline_step
+            FROM user_progress WHERE user_id = ?
+        """, (user_id,)).fetchone()
+        if row is None:
+            return None
+        scans, latest_stage, first_scan, last_scan, stage_counts, timeline, timeline_step = row
+        return {'scans': scans, 'latest_stage': latest_stage, 'first_scan': first_scan, 'last_scan': last_scan,
+                'stage_counts': json.loads(stage_counts), 'timeline': json.loads(timeline),
+                'timeline_step': timeline_step}
+
+    @staticmethod
+    def _write_progress(conn, user_id, progress):
+        conn.execute("""
+            INSERT OR REPLACE INTO user_progress
+                (user_id, scans, latest_stage, first_scan, last_scan, stage_counts, timeline, timeline_step)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, progress['scans'], progress['latest_stage'], progress['first_scan'], progress['last_scan'],
+              json.dumps(progress['stage_counts']), json.dumps(progress['timeline']), progress['timeline_step']))
+
+    @staticmethod
+    def _build_progress(conn, user_id):
+        progress = empty_progress()
+        rows = conn.execute("""
+            SELECT upload_time, stage FROM user_images WHERE user_id = ?
+            ORDER BY upload_time, image_id
+        """, (user_id,))
+        for upload_time, stage in rows:
+            fold_progress(progress, upload_time, stage)
+        return progress
+
+    def progress(self, user_id):
+        """The user's progress summary, None if they have no history."""
+        with self.db.transaction() as conn:
+            progress = self._read_progress(conn, user_id)
+            if progress is None and conn.execute(
+                    "SELECT 1 FROM user_images WHERE user_id = ? LIMIT 1", (user_id,)).fetchone() is None:
+                return None
+        if progress is None:
+            # History from before user_progress existed and hasn't been backfilled yet
+            progress = self.rebuild_progress(user_id)
+        if not progress['scans']:
+            return None
+        # timeline_step is only needed to keep folding new scans in
+        return {key: value for key, value in progress.items() if key != 'timeline_step'}
+
+    def rebuild_progress(self, user_id):
+        """Recompute a user's summary from their whole history."""
+        with self.db.transaction(write=True) as conn:
+            progress = self._build_progress(conn, user_id)
+            if progress['scans']:
+                self._write_progress(conn, user_id, progress)
+        return progress
+
+    def users_without_progress(self):
+        with self.db.transaction() as conn:
+            return [row[0] for row in conn.execute("""
+                SELECT DISTINCT user_id FROM user_images
+                WHERE user_id NOT IN (SELECT user_id FROM user_progress)
+            """)]
+
+    def users(self):
+        with self.db.transaction() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM user_images")]
+
+    def history(self, user_id, limit=None, before=None, metadata_only=False):
+        """Cursor over (image_id, image_data, image_key, upload_time, stage), newest first.
+
+        before is an (upload_time, image_id) pair to continue after. With
+        metadata_only image_data is always None, so legacy base64 images
+        aren't read from disk. The caller iterates the returned cursor and
+        must close it.
+        """
+        image_data = "NULL" if metadata_only else "image_data"
+        query = f"SELECT image_id, {image_data}, image_key, upload_time, stage FROM user_images WHERE user_id = ?"
+        params = [user_id]
+        if before is not None:
+            query += " AND (upload_time, image_id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY upload_time DESC, image_id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self.db.connection().execute(query, params)
+
+    def legacy_rows(self, after_id, limit):
+        """Rows that still hold a base64 image in image_data."""
+        with self.db.transaction() as conn:
+            return conn.execute("""
+                SELECT image_id, image_data FROM user_images
+                WHERE image_id > ? AND image_key IS NULL AND image_data != ''
+                ORDER BY image_id LIMIT ?
+            """, (after_id, limit)).fetchall()
+
+    def move_to_blobs(self, updates):
+        """Apply (image_key, image_size, image_id) updates and drop the inline data."""
+        with self.db.transaction(write=True) as conn:
+            conn.executemany("UPDATE user_images SET image_key = ?, image_size = ?, image_data = '' WHERE image_id = ?",
+                             updates)
+
+    def vacuum(self):
+        self.db.connection().execute('VACUUM')
+
+
+class JobRepository:
+    """Status and result of asynchronous prediction jobs, readable by every worker."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def init_schema(self):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    finished REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished)")
+
+    def create(self, job_id, created):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("INSERT INTO jobs (job_id, status, created) VALUES (?, 'queued', ?)", (job_id, created))
+
+    def update(self, job_id, status, result=None, error=None, finished=None):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE job_id = ?",
+                         (status, None if result is None else json.dumps(result), error, finished, job_id))
+
+    def get(self, job_id):
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT job_id, status, result, error, created, finished FROM jobs WHERE job_id = ?",
+                               (job_id,)).fetchone()
+        if row is None:
+            return None
+        job_id, status, result, error, created, finished = row
+        return {"job_id": job_id, "status": status, "result": None if result is None else json.loads(result),
+                "error": error, "created": created, "finished": finished}
+
+    def prune(self, cutoff, stale_before=None):
+        """Delete jobs that finished before cutoff.
+
+        Jobs still queued or running that were created before stale_before
+        are marked as failed, the worker running them has died or restarted.
+        They are deleted like any other finished job once cutoff passes them.
+        """
+        with self.db.transaction(write=True) as conn:
+            if stale_before is not None:
+                conn.execute("""
+                    UPDATE jobs SET status = 'error', error = 'Job did not finish in time', finished = ?
+                    WHERE finished IS NULL AND created < ?
+                """, (time.time(), stale_before))
+            conn.execute("DELETE FROM jobs WHERE finished < ?", (cutoff,))
+
+    def count(self):
+        with self.db.transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+class UploadRepository:
+    """Uploaded images and the cached prediction for each distinct image."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def init_schema(self):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    upload_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    upload_time TIMESTAMP NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_user_time ON uploads (user_id, upload_time DESC)")
+            # Keyed by model version too, a new model has to predict again
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    content_hash TEXT NOT NULL,
+                    model_version TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    class_id INTEGER,
+                    image_key TEXT,
+                    image_size INTEGER,
+                    created TIMESTAMP NOT NULL,
+                    PRIMARY KEY (content_hash, model_version)
+                )
+            """)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(predictions)')}
+            if 'confidence' not in columns:
+                conn.execute('ALTER TABLE predictions ADD COLUMN confidence REAL')
+            if 'box' not in columns:
+                conn.execute('ALTER TABLE predictions ADD COLUMN box TEXT')
+
+    def add(self, upload_id, user_id, content_hash, path, upload_time):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("INSERT INTO uploads (upload_id, user_id, content_hash, path, upload_time) VALUES (?, ?, ?, ?, ?)",
+                         (upload_id, user_id, content_hash, path, upload_time))
+
+    def get(self, user_id, upload_id):
+        """(content_hash, path) of the user's upload, None if there is no such upload."""
+        with self.db.transaction() as conn:
+            return conn.execute("SELECT content_hash, path FROM uploads WHERE upload_id = ? AND user_id = ?",
+                                (upload_id, user_id)).fetchone()
+
+    def latest(self, user_id):
+        with self.db.transaction() as conn:
+            return conn.execute("""
+                SELECT content_hash, path FROM uploads WHERE user_id = ?
+                ORDER BY upload_time DESC LIMIT 1
+            """, (user_id,)).fetchone()
+
+    def cached_prediction(self, content_hash, model_version):
+        """Prediction made earlier for this image by this model, or None.
+
+        Returns a dict with stage, class_id, confidence, box, image_key and image_size.
+        """
+        with self.db.transaction() as conn:
+            row = conn.execute("""
+                SELECT stage, class_id, confidence, box, image_key, image_size FROM predictions
+                WHERE content_hash = ? AND model_version = ?
+            """, (content_hash, model_version)).fetchone()
+        if row is None:
+            return None
+        prediction = dict(zip(('stage', 'class_id', 'confidence', 'box', 'image_key', 'image_size'), row))
+        prediction['box'] = json.loads(prediction['box']) if prediction['box'] else None
+        return prediction
+
+    def save_prediction(self, content_hash, model_version, stage, detection, image_key, image_size, created):
+        with self.db.transaction(write=True) as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO predictions
+                    (content_hash, model_version, stage, class_id, confidence, box, image_key, image_size, created)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (content_hash, model_version, stage, detection['class_id'], detection['confidence'],
+                  json.dumps(detection['box']), image_key, image_size, created))
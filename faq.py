@@ -0,0 +1,188 @@
+import json
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+# Includes what is left of contractions once the apostrophe splits them ("i'm")
+STOPWORDS = frozenset("""
+a am an and any are at be by can d do does for from have how i if im in is it ll
+m my of on or re s should the there to ve what when which with you your
+""".split())
+
+
+def tokenize(text):
+    return [token for token in re.findall(r'[a-z0-9]+', text.lower()) if token not in STOPWORDS]
+
+
+def key_terms(tokens):
+    """Tokens a prompt and a question must agree on, numbers such as the hairfall stage."""
+    return frozenset(token for token in tokens if token.isdigit())
+
+
+def load_faq(path):
+    """Read (question, answer) pairs from the chatbot dataset's conversation_history."""
+    with open(path, encoding='utf-8') as f:
+        dataset = json.load(f)
+    pairs = []
+    for entry in dataset['payload']['conversation_history']:
+        for question, answer in entry.items():
+            pairs.append((question.strip(), answer))
+    return pairs
+
+
+class FAQIndex:
+    """TF-IDF index over the FAQ questions.
+
+    Questions are turned into L2-normalised TF-IDF vectors stacked in one
+    matrix, so matching a prompt is a single matrix-vector product giving the
+    cosine similarity against every question.
+
+    Words that appear in no question still count towards the prompt's norm
+    (weighted like the rarest known word), so "breastfeeding" in place of
+    "pregnant" lowers the score instead of being ignored. A question whose
+    numbers differ from the prompt's ("stage 3" vs "stage 2") never matches.
+    """
+
+    def __init__(self, pairs):
+        self.questions = [question for question, _ in pairs]
+        self.answers = [answer for _, answer in pairs]
+
+        documents = [tokenize(question) for question in self.questions]
+        self.key_terms = [key_terms(tokens) for tokens in documents]
+        self.vocabulary = {}
+        for tokens in documents:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        document_frequency = np.zeros(len(self.vocabulary))
+        for tokens in documents:
+            for token in set(tokens):
+                document_frequency[self.vocabulary[token]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+        self.unknown_idf = float(self.idf.max()) if len(self.idf) else 1.0
+
+        self.matrix = np.vstack([self._vector(tokens) for tokens in documents]) if documents \
+            else np.zeros((0, len(self.vocabulary)))
+
+    def _vector(self, tokens):
+        vector = np.zeros(len(self.vocabulary))
+        unknown = {}
+        for token in tokens:
+            index = self.vocabulary.get(token)
+            if index is not None:
+                vector[index] += 1
+            else:
+                unknown[token] = unknown.get(token, 0) + 1
+        # Sublinear term frequency, repeating a word shouldn't dominate the match
+        vector = np.log1p(vector) * self.idf
+        unknown_weight = sum((np.log1p(count) * self.unknown_idf) ** 2 for count in unknown.values())
+        norm = np.sqrt(np.dot(vector, vector) + unknown_weight)
+        return vector / norm if norm else vector
+
+    def match(self, prompt):
+        """Return (score, question, answer) for the closest FAQ entry, or None."""
+        if not len(self.questions):
+            return None
+        tokens = tokenize(prompt)
+        scores = self.matrix @ self._vector(tokens)
+        terms = key_terms(tokens)
+        for i, question_terms in enumerate(self.key_terms):
+            if question_terms != terms:
+                scores[i] = 0.0
+        best = int(np.argmax(scores))
+        return float(scores[best]), self.questions[best], self.answers[best]
+
+
+class FAQResponder:
+    """Answers prompts from the FAQ index and only calls backend for the rest.
+
+    backend is any callable taking the prompt and returning the answer text,
+    which makes it easy to swap the remote API for a stub offline. A backend
+    with ask() and stream() methods taking an on_upstream callback (such as
+    chatbot.ChatbotClient) can stream, and only its real API calls count as
+    misses, not its cache hits or aborted streams.
+    """
+
+    def __init__(self, index, backend, threshold=0.8):
+        self.index = index
+        self.backend = backend
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend_seconds = 0.0
+
+    def lookup(self, prompt):
+        """Return the FAQ answer if the prompt matches one closely enough, otherwise None."""
+        with time_stage('faq_lookup'):
+            match = self.index.match(prompt)
+        if match is None or match[0] < self.threshold:
+            return None
+
+        with self._lock:
+            self.hits += 1
+        stats = self.stats()
+        logger.info("FAQ hit (score %.2f) for %r, hit rate %.0f%%, ~%.0fms of backend time saved so far",
+                    match[0], match[1], stats['hit_rate'] * 100, stats['saved_seconds'] * 1000)
+        return match[2]
+
+    def record_backend_call(self, seconds):
+        with self._lock:
+            self.misses += 1
+            self.backend_seconds += seconds
+
+    def _ask_backend(self, prompt):
+        ask = getattr(self.backend, 'ask', None)
+        if ask is not None:
+            return ask(prompt, on_upstream=self.record_backend_call)
+        start = time.perf_counter()
+        answer = self.backend(prompt)
+        self.record_backend_call(time.perf_counter() - start)
+        return answer
+
+    def __call__(self, prompt):
+        answer = self.lookup(prompt)
+        if answer is not None:
+            return answer
+        return self._ask_backend(prompt)
+
+    def stream(self, prompt):
+        """Yield the answer in chunks, in one piece unless the backend streams it."""
+        answer = self.lookup(prompt)
+        if answer is not None:
+            yield answer
+            return
+        stream = getattr(self.backend, 'stream', None)
+        if stream is None:
+            yield self._ask_backend(prompt)
+            return
+        yield from stream(prompt, on_upstream=self.record_backend_call)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, backend_seconds = self.hits, self.misses, self.backend_seconds
+        total = hits + misses
+        # Each hit is assumed to have saved an average backend round trip
+        average_backend = backend_seconds / misses if misses else None
+        return {
+            "threshold": self.threshold,
+            "questions": len(self.index.questions),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "average_backend_seconds": average_backend,
+            "saved_seconds": hits * average_backend if average_backend is not None else 0.0,
+        }
+
+
+def stub_backend(prompt):
+    """Offline stand-in for the remote chatbot API."""
+    return f"(stub) You asked: {prompt}"
@@ -0,0 +1,25 @@
+import os
+
+# Streaming endpoints (chatbot SSE, prediction job events) keep a response
+# open for a while. With threaded workers that only occupies one thread
+# instead of a whole sync worker. Don't use gevent/eventlet: inference and
+# rendering run on threads that would become greenlets and block every other
+# request in the worker, and the per-thread SQLite connections would be
+# opened per greenlet.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Load the app (and the model, see wsgi.py) once in the master before forking
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+if preload_app:
+    os.environ.setdefault('MODEL_PRELOAD', '1')
+
+
+def post_worker_init(worker):
+    # Runs in each worker after forking, so the loader thread and its lock
+    # belong to this process. MODEL_PRELOAD=0 leaves it to the first request.
+    if os.environ.get('MODEL_PRELOAD') != '0':
+        from server import model_registry
+        model_registry.load_in_background()
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import tempfile
+
+# Longest side of the normalized image, the size YOLO resizes to anyway
+MODEL_INPUT_SIZE = 640
+# Larger images are refused before they are decoded, a small compressed file
+# can expand to gigabytes of pixels. Leaves room for 48 MP phone cameras.
+MAX_IMAGE_PIXELS = 50 * 1000 * 1000
+CHUNK_SIZE = 64 * 1024
+
+
+class IngestError(ValueError):
+    pass
+
+
+def ingest_upload(stream, upload_folder, max_size=MODEL_INPUT_SIZE, max_bytes=20 * 1024 * 1024,
+                  max_pixels=MAX_IMAGE_PIXELS):
+    """Store an uploaded image ready for inference and return (content_hash, path).
+
+    The upload is streamed to a temp file while hashing it, checked with PIL,
+    rotated according to its EXIF orientation, converted to RGB and
+    downscaled so its longest side is max_size. Images with more than
+    max_pixels pixels are refused before being decoded. The result is written to
+    <upload_folder>/<content_hash>.jpg, so uploading the same bytes again
+    reuses the existing file. Raises IngestError for anything that isn't a
+    readable image.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise IngestError(f"Image larger than {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        content_hash = digest.hexdigest()
+        path = os.path.join(upload_folder, f"{content_hash}.jpg")
+        if os.path.exists(path):
+            return content_hash, path
+
+        try:
+            with Image.open(tmp_path) as image:
+                width, height = image.size
+                if width * height > max_pixels:
+                    raise IngestError(f"Image larger than {max_pixels // 1000000} megapixels")
+                image.verify()
+            # verify() leaves the image unusable, so it is opened again to decode it
+            with Image.open(tmp_path) as image:
+                image.draft('RGB', (max_size, max_size))
+                image = ImageOps.exif_transpose(image).convert('RGB')
+        except Image.DecompressionBombError as e:
+            raise IngestError(f"Image larger than {max_pixels // 1000000} megapixels") from e
+        except (UnidentifiedImageError, OSError, SyntaxError) as e:
+            raise IngestError("Not a valid image") from e
+
+        image.thumbnail((max_size, max_size))
+        normalized_fd, normalized_tmp = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+        try:
+            with os.fdopen(normalized_fd, 'wb') as f:
+                image.save(f, format='JPEG', quality=95)
+            os.replace(normalized_tmp, path)
+        except BaseException:
+            os.remove(normalized_tmp)
+            raise
+        return content_hash, path
+    finally:
+        os.remove(tmp_path)
@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+
+from lazy import LazyExecutor
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id=None, status='queued', result=None, error=None, created=None, finished=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.status = status
+        self.result = result
+        self.error = error
+        self.created = time.time() if created is None else created
+        self.finished = finished
+
+    @property
+    def done(self):
+        return self.status in ('done', 'error')
+
+    def to_dict(self):
+        job = {"job_id": self.id, "status": self.status}
+        if self.status == 'done':
+            job["result"] = self.result
+        elif self.status == 'error':
+            job["error"] = self.error
+        return job
+
+
+class JobManager:
+    """Runs prediction jobs on a bounded thread pool.
+
+    At most max_queue jobs can be queued or running at once in this worker,
+    further submissions raise QueueFull so the caller can push back instead of
+    letting a spike pile up work. Job status and results are kept in the store
+    (see db.JobRepository) rather than in memory, so any worker can answer a
+    poll for a job another worker runs. Finished jobs are kept for ttl
+    seconds, expired ones are deleted by submissions and reads at most every
+    prune_interval seconds. A job that still isn't finished max_runtime
+    seconds after it was submitted (its worker died or restarted) is marked
+    as failed by the same pruning.
+    """
+
+    def __init__(self, store, max_workers=2, max_queue=32, ttl=300, max_runtime=360, poll_interval=0.25,
+                 prune_interval=30):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.max_runtime = max_runtime
+        self.poll_interval = poll_interval
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+
+        self._executor = LazyExecutor(max_workers, "predict-job")
+        # Set when a job run by this worker finishes, so local waiters don't poll
+        self._finished = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise QueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+        try:
+            self._maybe_prune()
+            job = Job()
+            self.store.create(job.id, job.created)
+            with self._lock:
+                self._finished[job.id] = threading.Event()
+            self._executor.submit(self._run, job, fn, args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job
+
+    def _run(self, job, fn, args):
+        try:
+            self.store.update(job.id, 'running')
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self.store.update(job.id, 'error', error=str(e), finished=time.time())
+            else:
+                self.store.update(job.id, 'done', result=result, finished=time.time())
+        finally:
+            with self._lock:
+                self._pending -= 1
+                finished = self._finished.pop(job.id)
+            finished.set()
+
+    def _maybe_prune(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune < self.prune_interval:
+                return
+            self._last_prune = now
+        now = time.time()
+        self.store.prune(now - self.ttl, stale_before=now - self.max_runtime)
+
+    def get(self, job_id):
+        self._maybe_prune()
+        row = self.store.get(job_id)
+        return None if row is None else Job(**row)
+
+    def wait(self, job_id, timeout):
+        """Return the job once it is finished or timeout seconds have passed, None if it doesn't exist."""
+        with self._lock:
+            finished = self._finished.get(job_id)
+        if finished is not None:
+            finished.wait(timeout)
+            return self.get(job_id)
+
+        # Run by another worker, or already finished
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.done or remaining <= 0:
+                return job
+            time.sleep(min(self.poll_interval, remaining))
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": pending,
+            "stored": self.store.count(),
+        }
@@ -0,0 +1,53 @@
+"""Thread pools and background threads that start on first use.
+
+With `gunicorn --preload` the app is imported in the master, which then
+forks the workers. Threads aren't copied into a forked child, so anything
+started at import time would be gone in the workers (and could leave locks
+held). Pools and threads built with these helpers are only started by the
+process that first uses them, and are started again after a fork.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LazyExecutor:
+    """ThreadPoolExecutor that is created on the first submit() in each process."""
+
+    def __init__(self, max_workers, thread_name_prefix):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=self.thread_name_prefix)
+                    self._pid = pid
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        return self._get().submit(fn, *args, **kwargs)
+
+
+class LazyThread:
+    """Daemon thread running target, started by ensure_started() if it isn't running."""
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self._thread.start()
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+
+from metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+# Default YOLO input size, used for the warm-up inference
+WARMUP_IMAGE_SIZE = 640
+
+
+class ModelRegistry:
+    """Keeps one warm YOLO model per process.
+
+    The weights are loaded once (before forking when gunicorn runs with
+    --preload, otherwise once per worker) and a dummy inference is run so the
+    first real request doesn't pay for lazy initialisation. The weights file
+    is polled for changes and a new model is loaded in the background and
+    swapped in when it is ready, so requests keep using the old model until
+    then.
+    """
+
+    def __init__(self, model_path, reload_interval=5.0, warmup=True):
+        self.model_path = model_path
+        self.reload_interval = reload_interval
+        self.warmup = warmup
+
+        self._model = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._last_check = 0.0
+        self._loader = None
+
+        self.load_error = None
+
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.loaded_at = None
+        self.loaded_pid = None
+        self.reloads = 0
+        self.reload_errors = 0
+
+        # A process forked while the loader (or a reload) held the lock would
+        # otherwise wait on it forever, the thread holding it isn't copied
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._loader = None
+        self._reloading = False
+
+    def _build(self):
+        mtime = os.stat(self.model_path).st_mtime_ns
+
+        start = time.perf_counter()
+        # Imported here so that importing the server doesn't pull in torch
+        from ultralytics import YOLO
+        model = YOLO(self.model_path)
+        load_seconds = time.perf_counter() - start
+        observe_stage('model_load', load_seconds)
+
+        warmup_seconds = None
+        if self.warmup:
+            import numpy as np
+
+            start = time.perf_counter()
+            model(np.zeros((WARMUP_IMAGE_SIZE, WARMUP_IMAGE_SIZE, 3), dtype=np.uint8), verbose=False)
+            warmup_seconds = time.perf_counter() - start
+            observe_stage('model_warmup', warmup_seconds)
+
+        return model, mtime, load_seconds, warmup_seconds
+
+    def _swap_in(self, model, mtime, load_seconds, warmup_seconds):
+        self._model = model
+        self._mtime = mtime
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.loaded_at = time.time()
+        self.loaded_pid = os.getpid()
+        self._last_check = time.monotonic()
+
+    def load(self, timeout=None):
+        """Load the model if it isn't loaded yet and return it.
+
+        Raises TimeoutError if another thread is still loading it after
+        timeout seconds.
+        """
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError(f"Timed out waiting for {self.model_path} to load")
+        try:
+            if self._model is None:
+                self._swap_in(*self._build())
+                logger.info("Loaded %s in %.3fs (warm-up %s)", self.model_path,
+                            self.load_seconds, self.warmup_seconds)
+            return self._model
+        finally:
+            self._lock.release()
+
+    def load_in_background(self):
+        """Start loading the model in a thread unless it is loaded or already loading."""
+        if self._model is not None:
+            return
+        if self._loader is not None and (self._loader.is_alive() or self.load_error is None):
+            return
+        self.load_error = None
+        self._loader = threading.Thread(target=self._background_load, name="model-load", daemon=True)
+        self._loader.start()
+
+    def _background_load(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.load_error = str(e)
+            logger.exception("Failed to load %s", self.model_path)
+
+    def get(self, timeout=None):
+        """Return the current model, scheduling a reload if the weights changed."""
+        model = self._model
+        if model is None:
+            return self.load(timeout)
+        self._maybe_reload()
+        return model
+
+    @property
+    def loaded(self):
+        """True once the model is loaded and warmed up."""
+        return self._model is not None
+
+    @property
+    def version(self):
+        """Identifies the loaded weights (their mtime), None until loaded."""
+        return None if self._mtime is None else str(self._mtime)
+
+    def _maybe_reload(self):
+        if not self.reload_interval:
+            return
+        now = time.monotonic()
+        if self._reloading or now - self._last_check < self.reload_interval:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.stat(self.model_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+
+        self._reloading = True
+        threading.Thread(target=self._reload, name="model-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            built = self._build()
+            with self._lock:
+                self._swap_in(*built)
+                self.reloads += 1
+            logger.info("Reloaded %s in %.3fs (warm-up %s)", self.model_path,
+                        self.load_seconds, self.warmup_seconds)
+        except Exception:
+            # Keep serving the old model, the next poll will try again
+            self.reload_errors += 1
+            logger.exception("Failed to reload %s", self.model_path)
+        finally:
+            self._reloading = False
+
+    def stats(self):
+        return {
+            "model_path": self.model_path,
+            "loaded": self.loaded,
+            "load_error": self.load_error,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "loaded_at": self.loaded_at,
+            "loaded_pid": self.loaded_pid,
+            "pid": os.getpid(),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
@@ -0,0 +1,97 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from lazy import LazyThread
+
+
+def fold_stack(frame, root=None):
+    """Collapse a frame's stack into flame graph folded format, root first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    if root:
+        names.append(root)
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests and keeps the ones that were slow.
+
+    While at least one request is being profiled a background thread wakes up
+    every interval_ms and records the stack of each request thread, plus the
+    stacks of helper threads (batch scheduler, render pool, ...) whose names
+    start with one of helper_threads, since predict requests mostly wait on
+    those. When a request that took threshold_ms or longer finishes, its
+    samples are written to output_dir as a .folded file that flamegraph.pl,
+    speedscope or inferno can render directly. Faster requests are discarded.
+    """
+
+    def __init__(self, threshold_ms, output_dir='profiles', interval_ms=5, helper_threads=(), max_files=200):
+        self.threshold = threshold_ms / 1000.0
+        self.output_dir = output_dir
+        self.interval = interval_ms / 1000.0
+        self.helper_threads = tuple(helper_threads)
+        self.max_files = max_files
+
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sampler = LazyThread(self._run, "profiler")
+        self.written = 0
+
+    def start(self):
+        """Begin sampling the calling thread."""
+        self._sampler.ensure_started()
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+        self._wakeup.set()
+
+    def stop(self, label, seconds):
+        """Stop sampling the calling thread and write its profile if the request was slow."""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or seconds < self.threshold:
+            return None
+        return self._write(label, seconds, samples)
+
+    def _write(self, label, seconds, samples):
+        os.makedirs(self.output_dir, exist_ok=True)
+        if len(os.listdir(self.output_dir)) >= self.max_files:
+            return None
+        name = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')
+        path = os.path.join(self.output_dir, f"{int(time.time() * 1000)}-{os.getpid()}-{name}-{int(seconds * 1000)}ms.folded")
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        return path
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._active
+            if idle:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+
+            frames = sys._current_frames()
+            helpers = [(thread.name, frames.get(thread.ident)) for thread in threading.enumerate()
+                       if thread.ident != own and thread.name.startswith(self.helper_threads)] if self.helper_threads else []
+            helper_stacks = [fold_stack(frame, root=name) for name, frame in helpers if frame is not None]
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[fold_stack(frame, root='request')] += 1
+                    for stack in helper_stacks:
+                        samples[stack] += 1
+            del frames
@@ -0,0 +1,77 @@
+from collections import namedtuple
+from io import BytesIO
+
+from lazy import LazyExecutor
+from metrics import time_stage
+
+# ?format= value -> (PIL format, blob extension)
+FORMATS = {
+    'png': ('PNG', 'png'),
+    'jpeg': ('JPEG', 'jpg'),
+    'jpg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+# What a predict request wants back: the annotated image at all, and if so
+# in which format and quality (ignored for PNG). background renders the image
+# for the history only, after the response has been sent.
+RenderOptions = namedtuple('RenderOptions', ['image', 'format', 'quality', 'background'])
+DEFAULT_RENDER_OPTIONS = RenderOptions(True, 'png', 85, False)
+
+
+def extension(fmt):
+    return FORMATS[fmt][1]
+
+
+def encode_image(image, fmt, quality):
+    pil_format, _ = FORMATS[fmt]
+    buffer = BytesIO()
+    with time_stage('encode'):
+        if pil_format == 'PNG':
+            image.save(buffer, format=pil_format)
+        else:
+            image.save(buffer, format=pil_format, quality=quality)
+    return buffer.getvalue()
+
+
+def render_result(result, fmt, quality):
+    """Draw the detections on the input image and encode it."""
+    from PIL import Image
+
+    with time_stage('plot'):
+        im_array = result.plot()
+    return encode_image(Image.fromarray(im_array[..., ::-1]), fmt, quality)
+
+
+def reencode(data, fmt, quality):
+    """Convert an already encoded image to another format."""
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        return encode_image(image.convert('RGB'), fmt, quality)
+
+
+def detection(result):
+    """Class id, confidence and xyxy box of the top detection."""
+    box = result.boxes[0]
+    return {
+        "class_id": int(box.cls[0].item()),
+        "confidence": round(float(box.conf[0].item()), 4),
+        "box": [round(float(v), 1) for v in box.xyxy[0].tolist()],
+    }
+
+
+class Renderer:
+    """Thread pool for plotting and encoding result images.
+
+    Keeps that work off the batch scheduler thread, so the next inference can
+    start while earlier results are still being encoded, and bounds how many
+    encodes compete with inference for the CPU.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = LazyExecutor(max_workers, "render")
+
+    def submit(self, fn, *args):
+        return self._executor.submit(fn, *args)
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import pytest
+
+# The server's modules live at the top of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db import Database, ProductRepository, UserImageRepository  # noqa: E402
+
+
+@pytest.fixture
+def user_images(tmp_path):
+    repository = UserImageRepository(Database(str(tmp_path / 'user_images.db')))
+    repository.init_schema()
+    return repository
+
+
+@pytest.fixture
+def insert_legacy(user_images):
+    """insert_legacy(user_id, [(upload_time, stage), ...], image_data='')
+
+    Adds rows the way they were written before the blob store and
+    user_progress existed: the base64 image inline and no progress summary.
+    """
+    def insert(user_id, rows, image_data=''):
+        with user_images.db.transaction(write=True) as conn:
+            conn.executemany("INSERT INTO user_images (user_id, image_data, upload_time, stage) VALUES (?, ?, ?, ?)",
+                             [(user_id, image_data, upload_time, stage) for upload_time, stage in rows])
+    return insert
+
+
+# Schema of the products table in data/database.db
+PRODUCTS_TABLE = """
+    CREATE TABLE products (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        NAME TEXT NOT NULL,
+        PRICE TEXT NOT NULL,
+        IMAGE TEXT,
+        DESCRIPTION TEXT,
+        BRAND TEXT,
+        BENEFITS TEXT,
+        URL TEXT,
+        CATEGORY TEXT,
+        BEST_SELLER TEXT
+    )
+"""
+
+PRODUCTS = [
+    {'NAME': 'Hair Fall Control Shampoo', 'PRICE': '₹ 999', 'DESCRIPTION': 'Gentle daily wash',
+     'BRAND': 'Ravel', 'CATEGORY': 'Hairfall', 'BEST_SELLER': 'true'},
+    {'NAME': 'Anti Dandruff Cleanser', 'PRICE': '₹ 349', 'DESCRIPTION': 'Clears flakes',
+     'BRAND': 'Fytika', 'CATEGORY': 'Dandruff', 'BEST_SELLER': 'false'},
+    {'NAME': 'Hair Growth Pack', 'PRICE': '₹ 1,299', 'DESCRIPTION': 'Minoxidil and biotin',
+     'BRAND': 'Man Matters', 'CATEGORY': 'Volumize', 'BEST_SELLER': 'true'},
+]
+
+
+def create_products_db(path):
+    db = Database(path)
+    with db.transaction(write=True) as conn:
+        conn.execute(PRODUCTS_TABLE)
+    products = ProductRepository(db)
+    products.init_schema()
+    for product in PRODUCTS:
+        products.create(product)
+    db.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'database.db')
+    create_products_db(path)
+    return path
+
+
+@pytest.fixture
+def products(db_path):
+    return ProductRepository(Database(db_path))
+
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """The server module, imported once against temporary databases and the stub YOLO from bench/."""
+    for module in ('flask', 'flask_cors', 'numpy', 'PIL'):
+        pytest.importorskip(module)
+
+    workdir = tmp_path_factory.mktemp('server')
+    create_products_db(str(workdir / 'database.db'))
+    open(workdir / 'stub.pt', 'wb').close()
+    with pytest.MonkeyPatch.context() as mp:
+        # The stub reads its timings when the model is first loaded, so this stays in place
+        mp.syspath_prepend(os.path.join(ROOT, 'bench', 'stub_ultralytics'))
+        for name, value in {
+            'PRODUCTS_DB': workdir / 'database.db',
+            'USER_IMAGES_DB': workdir / 'user_images.db',
+            'BLOB_FOLDER': workdir / 'blobs',
+            'MODEL_PATH': workdir / 'stub.pt',
+            'MODEL_RELOAD_INTERVAL': 0,
+            'CHATBOT_DATASET': os.path.join(ROOT, 'chat_bot_dataset.json'),
+            'CHATBOT_BACKEND': 'stub',
+            'STUB_YOLO_LOAD_MS': 0,
+            'STUB_YOLO_MS': 0,
+            'STUB_YOLO_IMAGE_MS': 0,
+        }.items():
+            mp.setenv(name, str(value))
+
+        import server
+        server.app.config['TESTING'] = True
+        server.app.config['UPLOAD_FOLDER'] = str(workdir / 'uploads')
+        os.makedirs(server.app.config['UPLOAD_FOLDER'])
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
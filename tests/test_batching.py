@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+import batching
+from batching import BatchScheduler
+
+
+class FakeModel:
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, images, verbose=False):
+        self.batches.append(list(images))
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return [f"result for {image}" for image in images]
+
+
+class FakeRegistry:
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, timeout=None):
+        return self.model
+
+
+@pytest.fixture(autouse=True)
+def paths_as_images(monkeypatch):
+    # The fake model gets the file path itself instead of a decoded array
+    monkeypatch.setattr(batching, 'load_image', lambda file_path: file_path)
+
+
+def test_full_batch_is_flushed_without_waiting():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeRegistry(model), max_batch_size=3, max_wait_ms=10000)
+
+    start = time.monotonic()
+    futures = [scheduler.submit(f"{i}.jpg") for i in range(3)]
+    assert [future.result(5) for future in futures] == [f"result for {i}.jpg" for i in range(3)]
+    assert time.monotonic() - start < 5
+    assert model.batches == [['0.jpg', '1.jpg', '2.jpg']]
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeRegistry(model), max_batch_size=8, max_wait_ms=50)
+
+    futures = [scheduler.submit(f"{i}.jpg") for i in range(2)]
+    assert [future.result(5) for future in futures] == ['result for 0.jpg', 'result for 1.jpg']
+    assert model.batches == [['0.jpg', '1.jpg']]
+    assert scheduler.stats()['batch_sizes'] == {2: 1}
+
+
+def test_results_go_back_to_their_own_requests():
+    model = FakeModel()
+    scheduler = BatchScheduler(FakeRegistry(model), max_batch_size=4, max_wait_ms=50)
+
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, scheduler.predict(f"{i}.jpg", 5)))
+               for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {i: f"result for {i}.jpg" for i in range(10)}
+    assert all(len(batch) <= 4 for batch in model.batches)
+
+
+def test_failed_batch_fails_every_request():
+    error = RuntimeError("CUDA out of memory")
+    scheduler = BatchScheduler(FakeRegistry(FakeModel(error)), max_batch_size=3, max_wait_ms=10000)
+
+    futures = [scheduler.submit(f"{i}.jpg") for i in range(3)]
+    assert [future.exception(5) for future in futures] == [error] * 3
+
+
+def test_timed_out_request_is_not_inferred():
+    model = FakeModel()
+    model.release.clear()
+    scheduler = BatchScheduler(FakeRegistry(model), max_batch_size=1, max_wait_ms=0)
+
+    # Keeps the scheduler busy so the next request stays queued
+    busy = scheduler.submit('busy.jpg')
+    assert model.started.wait(5)
+    with pytest.raises(TimeoutError):
+        scheduler.predict('late.jpg', timeout=0.1)
+
+    model.release.set()
+    assert busy.result(5) == 'result for busy.jpg'
+    assert scheduler.predict('next.jpg', timeout=5) == 'result for next.jpg'
+    assert model.batches == [['busy.jpg'], ['next.jpg']]
@@ -0,0 +1,41 @@
+import hashlib
+import os
+
+import pytest
+
+from blob_store import BlobStore
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    return BlobStore(str(tmp_path / 'blobs'))
+
+
+@pytest.mark.parametrize('key', [
+    None,
+    '',
+    '../' + 'a' * 61 + '.png',
+    'a' * 64 + '.png/../../etc/passwd',
+    'a' * 64,
+    'A' * 64 + '.png',
+    'a' * 64 + '.toolong',
+])
+def test_invalid_keys_are_rejected(blob_store, key):
+    assert not BlobStore.is_valid_key(key)
+    assert not blob_store.exists(key)
+    with pytest.raises(ValueError):
+        blob_store.path(key)
+
+
+def test_put_is_idempotent(blob_store):
+    key = blob_store.put(b'result image', 'png')
+    assert key == hashlib.sha256(b'result image').hexdigest() + '.png'
+    path = blob_store.path(key)
+    assert path == os.path.join(blob_store.root, key[:2], key)
+    mtime = os.stat(path).st_mtime_ns
+
+    assert blob_store.put(b'result image', 'png') == key
+    assert os.stat(path).st_mtime_ns == mtime
+    assert blob_store.read(key) == b'result image'
+    # No temp files are left next to the blob
+    assert os.listdir(os.path.dirname(path)) == [key]
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+import chatbot
+from chatbot import ChatbotClient, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(chatbot.time, 'monotonic', clock)
+    return clock
+
+
+def test_cache_entries_expire(clock):
+    cache = TTLCache(max_size=4, ttl=10)
+    cache.put('a', 'answer')
+    clock.now += 9
+    assert cache.get('a') == 'answer'
+    clock.now += 2
+    assert cache.get('a') is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(max_size=2, ttl=10)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_concurrent_identical_prompts_share_one_call():
+    client = ChatbotClient({'question': ''}, {})
+    release = threading.Event()
+    calls = []
+
+    def request(prompt):
+        calls.append(prompt)
+        release.wait(5)
+        return f"answer to {prompt}"
+    client.request = request
+
+    answers = []
+    # Differently spelled prompts normalize to the same key
+    prompts = ['How do I order?', 'how do i order', 'How  do I order!!', 'HOW DO I ORDER?']
+    threads = [threading.Thread(target=lambda p=p: answers.append(client.ask(p))) for p in prompts]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while client.coalesced < len(prompts) - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert answers == [f"answer to {calls[0]}"] * len(prompts)
+    assert client.ask('how do I order') == answers[0]
+    assert len(calls) == 1
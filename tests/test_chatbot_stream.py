@@ -0,0 +1,35 @@
+import pytest
+
+from chatbot import ChatbotClient
+
+
+@pytest.mark.parametrize('line, text', [
+    ('data: {"content": "Hello"}', 'Hello'),
+    ('data: {"content": " world"}', ' world'),
+    ('data: "plain"', 'plain'),
+    ('data: not json', 'not json'),
+    ('data: [DONE]', None),
+    ('data: {"processing_time": 12}', None),
+    (': keep-alive', None),
+    ('', None),
+])
+def test_parse_stream_line(line, text):
+    assert ChatbotClient.parse_stream_line(line) == text
+
+
+def test_stream_from_mock_api():
+    pytest.importorskip('requests')
+    from bench.mock_chatbot import start_mock_chatbot
+
+    server, url = start_mock_chatbot()
+    try:
+        client = ChatbotClient({'question': ''}, {}, url=url)
+        upstream = []
+        chunks = list(client.stream('Does it work?', on_upstream=upstream.append))
+        assert ''.join(chunks) == 'Mock answer to: Does it work?'
+        assert len(chunks) > 1 and len(upstream) == 1
+        # The complete answer is cached, asking again doesn't reach the API
+        assert client.ask('does it work') == 'Mock answer to: Does it work?'
+        assert server.requests == 1
+    finally:
+        server.shutdown()
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from faq import FAQIndex, FAQResponder, load_faq
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'chat_bot_dataset.json')
+THRESHOLD = 0.8
+
+
+@pytest.fixture(scope='module')
+def responder():
+    return FAQResponder(FAQIndex(load_faq(DATASET)), backend=lambda prompt: None, threshold=THRESHOLD)
+
+
+def answer_for(question):
+    return dict(load_faq(DATASET))[question]
+
+
+@pytest.mark.parametrize('prompt, question', [
+    ("What services does Scalp Smart offer", "What services does Scalp Smart offer?"),
+    ("how do I order scalp smart products", "How do I order Scalp Smart products?"),
+    ("Is there a money back guarantee on Scalp Smart products?",
+     "Is there a money-back guarantee for Scalp Smart products?"),
+    ("I'm at stage 2, how can I grow back my hair?", "I am at stage 2, how can I grow my hair back?"),
+    ("Are there side effects of Scalp Smart products?", "Are there any side effects to using Scalp Smart products?"),
+    ("Can Scalp Smart help with dandruff?", "Can Scalp Smart help with dandruff issues?"),
+    ("Can I use Scalp Smart products when I am pregnant?", "Can I use Scalp Smart products if I'm pregnant?"),
+    ("can i use scalp smart products on color treated hair?",
+     "Can I use Scalp Smart products on color-treated hair?"),
+])
+def test_rephrasings_get_the_faq_answer(responder, prompt, question):
+    assert responder.lookup(prompt) == answer_for(question)
+
+
+@pytest.mark.parametrize('prompt', [
+    # Same wording as a FAQ question but a different stage or number
+    "I am at stage 3, how can I grow my hair back?",
+    "I am at stage 1, how can I grow my hair back?",
+    "I have been using your products for the past 3 months but see no change, what should I do?",
+    # One word away from a FAQ question, with a different meaning
+    "Can I use Scalp Smart products if I'm breastfeeding?",
+    "Does Scalp Smart have a referral program?",
+    "Can Scalp Smart cure cancer?",
+    "Can I use Scalp Smart products if I'm diabetic?",
+    "Do I need a prescription for minoxidil?",
+    "Can Scalp Smart products be used on pets?",
+    "Is Scalp Smart available in stores?",
+])
+def test_near_misses_go_to_the_backend(responder, prompt):
+    assert responder.lookup(prompt) is None
+
+
+def test_numbers_must_match():
+    index = FAQIndex([("I am at stage 2, how can I grow my hair back?", "stage 2 advice")])
+    assert index.match("I am at stage 2, how can I grow my hair back?")[0] == pytest.approx(1.0)
+    assert index.match("I am at stage 3, how can I grow my hair back?")[0] == 0.0
+
+
+def test_unknown_words_lower_the_score():
+    index = FAQIndex(load_faq(DATASET))
+    score, question, _ = index.match("Does Scalp Smart have a referral program?")
+    assert question == "Does Scalp Smart have a loyalty program?"
+    assert score < THRESHOLD
+
+
+def test_backend_answers_misses():
+    index = FAQIndex(load_faq(DATASET))
+    responder = FAQResponder(index, backend=lambda prompt: f"backend: {prompt}", threshold=THRESHOLD)
+    assert responder("Does Scalp Smart have a referral program?") == "backend: Does Scalp Smart have a referral program?"
+    assert responder.stats()['misses'] == 1
+
+
+class StreamingBackend:
+    """Stands in for chatbot.ChatbotClient: cached prompts never reach the API."""
+
+    def __init__(self, cached=()):
+        self.cached = set(cached)
+
+    def ask(self, prompt, on_upstream=None):
+        if prompt not in self.cached and on_upstream is not None:
+            on_upstream(0.5)
+        return f"backend: {prompt}"
+
+    def stream(self, prompt, on_upstream=None):
+        if prompt in self.cached:
+            yield f"backend: {prompt}"
+            return
+        yield "backend: "
+        yield prompt
+        if on_upstream is not None:
+            on_upstream(0.5)
+
+
+def test_only_upstream_calls_count_as_misses():
+    prompt = "Does Scalp Smart have a referral program?"
+    responder = FAQResponder(FAQIndex(load_faq(DATASET)), backend=StreamingBackend(cached=[prompt]),
+                             threshold=THRESHOLD)
+    assert responder(prompt) == f"backend: {prompt}"
+    assert ''.join(responder.stream(prompt)) == f"backend: {prompt}"
+    assert responder.stats()['misses'] == 0
+
+
+def test_streams_are_counted_when_they_complete():
+    prompt = "Can Scalp Smart cure cancer?"
+    responder = FAQResponder(FAQIndex(load_faq(DATASET)), backend=StreamingBackend(), threshold=THRESHOLD)
+
+    chunks = responder.stream(prompt)
+    assert next(chunks) == "backend: "
+    chunks.close()
+    assert responder.stats()['misses'] == 0
+
+    assert list(responder.stream(prompt)) == ["backend: ", prompt]
+    assert responder.stats()['misses'] == 1
+    assert responder.stats()['average_backend_seconds'] == 0.5
+
+
+def test_faq_answers_are_streamed_in_one_piece(responder):
+    question = "What services does Scalp Smart offer?"
+    assert list(responder.stream(question)) == [answer_for(question)]
@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_metadata_only_skips_image_data(user_images, insert_legacy):
+    insert_legacy('u1', [('2024-01-01 10:00:00', 'normal')], image_data='aGVsbG8=')
+
+    rows = user_images.history('u1')
+    assert [row[1] for row in rows] == ['aGVsbG8=']
+    rows.close()
+
+    rows = user_images.history('u1', metadata_only=True)
+    assert list(rows) == [(1, None, None, '2024-01-01 10:00:00', 'normal')]
+    rows.close()
+
+
+def test_cursor_pages_over_equal_upload_times(user_images, insert_legacy):
+    # Several scans share an upload_time, the cursor has to tell them apart by image_id
+    times = ['2024-01-01 10:00:00'] * 5 + ['2024-01-02 10:00:00'] * 2 + ['2024-01-03 10:00:00']
+    insert_legacy('u1', [(upload_time, 'normal') for upload_time in times])
+    insert_legacy('u2', [(times[0], 'normal')])
+
+    seen = []
+    before = None
+    while True:
+        rows = user_images.history('u1', limit=3, before=before, metadata_only=True)
+        page = [(image_id, upload_time) for image_id, _, _, upload_time, _ in rows]
+        rows.close()
+        if not page:
+            break
+        seen.extend(page)
+        before = tuple(reversed(page[-1]))
+
+    assert [image_id for image_id, _ in seen] == [8, 7, 6, 5, 4, 3, 2, 1]
+    assert [upload_time for _, upload_time in seen] == sorted(times, reverse=True)
+
+
+@pytest.mark.parametrize('limit', ['abc', '1.5', ''])
+def test_bad_limit_is_rejected(client, limit):
+    response = client.get('/api/images/u1', query_string={'limit': limit})
+    assert response.status_code == 400
+    assert response.json == {'error': 'limit must be an integer'}
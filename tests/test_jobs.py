@@ -0,0 +1,22 @@
+import time
+
+from db import Database, JobRepository
+from jobs import JobManager
+
+
+def test_unfinished_jobs_expire(tmp_path):
+    store = JobRepository(Database(str(tmp_path / 'user_images.db')))
+    store.init_schema()
+    # Left running by a worker that died long ago
+    store.create('stale', time.time() - 10000)
+    store.update('stale', 'running')
+    store.create('fresh', time.time())
+
+    jobs = JobManager(store, ttl=1, max_runtime=60)
+    job = jobs.get('stale')
+    assert job.status == 'error' and job.done
+    assert jobs.get('fresh').status == 'queued'
+
+    store.prune(time.time() + 2)
+    assert store.get('stale') is None
+    assert store.get('fresh') is not None
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from lazy import LazyExecutor, LazyThread
+
+
+def test_executor_starts_on_first_submit():
+    executor = LazyExecutor(2, "test")
+    assert executor._executor is None
+    assert executor.submit(pow, 2, 3).result(5) == 8
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_executor_is_recreated_after_fork():
+    executor = LazyExecutor(1, "test")
+    assert executor.submit(os.getpid).result(5) == os.getpid()
+
+    pid = os.fork()
+    if pid == 0:
+        # The parent's pool threads don't exist here
+        try:
+            ok = executor.submit(os.getpid).result(5) == os.getpid()
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_thread_is_restarted_once_it_exits():
+    runs = []
+    thread = LazyThread(lambda: runs.append(1), "test")
+    for _ in range(2):
+        thread.ensure_started()
+        thread._thread.join(5)
+    assert runs == [1, 1]
@@ -0,0 +1,25 @@
+import json
+
+from catalog_cache import CatalogCache
+from db import Database, ProductRepository
+
+
+def test_write_from_another_worker_invalidates_the_cache(db_path, products):
+    cache = CatalogCache(products, json.dumps)
+    body, etag = cache.get(('list',), products.list)
+    assert cache.get(('list',), products.list) == (body, etag)
+    assert cache.stats()['hits'] == 1
+
+    # A second Database has its own connections, like another gunicorn worker
+    ProductRepository(Database(db_path)).update(1, {'PRICE': '₹ 899'})
+
+    new_body, new_etag = cache.get(('list',), products.list)
+    assert new_etag != etag
+    assert '₹ 899' in json.loads(new_body)[0]['PRICE']
+    assert cache.stats()['misses'] == 2
+
+
+def test_missing_entries_are_not_cached(products):
+    cache = CatalogCache(products, json.dumps)
+    assert cache.get(('product', 42), lambda: products.get(42)) is None
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,89 @@
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import PROGRESS_TIMELINE_SIZE, empty_progress, fold_progress
+
+START = datetime(2024, 1, 1)
+
+
+def scan_time(i):
+    return (START + timedelta(hours=i)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@pytest.mark.parametrize('scans', [1, 16, 17, 100, 1000])
+def test_timeline_is_downsampled_evenly(scans):
+    progress = empty_progress()
+    for i in range(scans):
+        fold_progress(progress, scan_time(i), 'normal')
+
+    step = progress['timeline_step']
+    assert progress['scans'] == scans
+    assert len(progress['timeline']) <= PROGRESS_TIMELINE_SIZE
+    assert [point[0] for point in progress['timeline']] == [scan_time(i) for i in range(0, scans, step)]
+    assert progress['first_scan'] == scan_time(0)
+    assert progress['last_scan'] == scan_time(scans - 1)
+
+
+def test_folding_matches_rebuild(user_images):
+    stages = ['normal', 'stage 1', 'stage 2', 'stage 3', 'bald']
+    for i in range(100):
+        user_images.add('u1', f'key{i}', 10, scan_time(i), stages[i % len(stages)])
+
+    folded = user_images.progress('u1')
+    user_images.rebuild_progress('u1')
+    assert user_images.progress('u1') == folded
+    assert folded['stage_counts'] == {stage: 20 for stage in stages}
+    assert folded['latest_stage'] == 'bald'
+
+
+def test_missing_stages_are_not_counted():
+    progress = empty_progress()
+    fold_progress(progress, scan_time(0), 'stage 1')
+    fold_progress(progress, scan_time(1), None)
+
+    assert progress['scans'] == 2
+    assert progress['stage_counts'] == {'stage 1': 1}
+    assert progress['latest_stage'] == 'stage 1'
+    assert progress['last_scan'] == scan_time(1)
+
+
+def test_progress_with_missing_stages_serializes(user_images, insert_legacy):
+    insert_legacy('1234', [(scan_time(i), None) for i in range(4)] + [(scan_time(4), 'stage 1')])
+
+    progress = user_images.progress('1234')
+    assert progress['stage_counts'] == {'stage 1': 1}
+    assert 'timeline_step' not in progress
+    json.dumps(progress, sort_keys=True)
+
+
+def test_unknown_user_does_not_take_the_write_lock(user_images):
+    writer = sqlite3.connect(user_images.db.path, isolation_level=None, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        assert user_images.progress('nobody') is None
+        assert time.monotonic() - start < 1
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+def test_etag_changes_when_the_summary_is_rebuilt(server, client):
+    # A summary kept with wrong counts, as before missing stages were handled
+    server.user_images.add('etag-user', None, None, scan_time(0), 'stage 1')
+    server.user_images.add('etag-user', None, None, scan_time(1), 'stage 2')
+    first = client.get('/api/progress/etag-user')
+    assert client.get('/api/progress/etag-user', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    with server.user_images_db.transaction(write=True) as conn:
+        conn.execute("UPDATE user_images SET stage = 'stage 3' WHERE user_id = 'etag-user'")
+    server.user_images.rebuild_progress('etag-user')
+
+    response = client.get('/api/progress/etag-user', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.json['scans'] == first.json['scans']
+    assert response.json['stage_counts'] == {'stage 3': 2}
@@ -0,0 +1,58 @@
+import pytest
+
+
+def names(rows):
+    return [row['NAME'] for row in rows]
+
+
+def test_search_index_follows_updates_and_deletes(products):
+    assert names(products.search(q='shampoo')) == ['Hair Fall Control Shampoo']
+
+    products.update(1, {'NAME': 'Onion Oil'})
+    assert products.search(q='shampoo') == []
+    assert names(products.search(q='onion')) == ['Onion Oil']
+    # Fields that aren't indexed keep the index as it is
+    products.update(1, {'PRICE': '₹ 199'})
+    assert names(products.search(q='onion')) == ['Onion Oil']
+
+    products.delete(1)
+    assert products.search(q='onion') == []
+
+
+def test_search_matches_word_prefixes_in_any_indexed_field(products):
+    assert names(products.search(q='minox')) == ['Hair Growth Pack']
+    assert names(products.search(q='hair', sort='id')) == ['Hair Fall Control Shampoo', 'Hair Growth Pack']
+
+
+def test_price_sorts_and_filters_numerically(products):
+    assert names(products.search(sort='price')) == [
+        'Anti Dandruff Cleanser', 'Hair Fall Control Shampoo', 'Hair Growth Pack']
+    assert names(products.search(sort='-price')) == [
+        'Hair Growth Pack', 'Hair Fall Control Shampoo', 'Anti Dandruff Cleanser']
+    assert names(products.search(min_price=500, sort='price')) == ['Hair Fall Control Shampoo', 'Hair Growth Pack']
+    assert names(products.search(max_price=1000, sort='price')) == [
+        'Anti Dandruff Cleanser', 'Hair Fall Control Shampoo']
+
+
+def test_filters_ignore_case(products):
+    assert names(products.search(category='hairfall')) == ['Hair Fall Control Shampoo']
+    assert names(products.search(best_seller=True)) == ['Hair Fall Control Shampoo', 'Hair Growth Pack']
+
+
+@pytest.mark.parametrize('params, error', [
+    ({'min_price': 'abc'}, 'min_price must be a number'),
+    ({'max_price': 'nan'}, 'max_price must be a number'),
+    ({'limit': 'ten'}, 'limit must be an integer'),
+    ({'offset': '1.5'}, 'offset must be an integer'),
+    ({'sort': 'rating'}, 'sort must be one of'),
+])
+def test_bad_search_parameters_are_explained(client, params, error):
+    response = client.get('/product/api/', query_string=params)
+    assert response.status_code == 400
+    assert response.json['error'].startswith(error)
+
+
+def test_search_route(client):
+    response = client.get('/product/api/', query_string={'q': 'hair', 'min_price': '500', 'sort': '-price'})
+    assert response.status_code == 200
+    assert names(response.json) == ['Hair Growth Pack', 'Hair Fall Control Shampoo']
@@ -0,0 +1,166 @@
+import base64
+import time
+from io import BytesIO
+
+import pytest
+
+
+def make_photo(color):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def upload(client, user_id, color):
+    response = client.post('/flutter/upload', query_string={'user_id': user_id},
+                           data={'image': (BytesIO(make_photo(color)), 'scan.png')})
+    assert response.status_code == 200, response.json
+    return response.json['upload_id']
+
+
+def predict(client, user_id, upload_id, **params):
+    return client.get('/flutter/predict', query_string=dict(params, user_id=user_id, upload_id=upload_id))
+
+
+def history(client, user_id):
+    return client.get(f'/api/images/{user_id}', query_string={'limit': 10}).json['images']
+
+
+def image_format(data):
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        return image.format
+
+
+@pytest.fixture
+def server(server):
+    # Loaded up front so model_version is known and predictions are cached
+    server.model_registry.load()
+    return server
+
+
+def test_default_prediction_returns_the_image(server, client):
+    upload_id = upload(client, 'render-png', (10, 20, 30))
+    response = predict(client, 'render-png', upload_id)
+
+    assert response.status_code == 200
+    body = response.json
+    assert body['stage'] in ('bald', 'normal', 'stage 1', 'stage 2', 'stage 3')
+    assert image_format(base64.b64decode(body['file'])) == 'PNG'
+    blob = client.get(body['image_url'])
+    assert blob.status_code == 200 and blob.data == base64.b64decode(body['file'])
+    assert history(client, 'render-png')[0]['image_url'] == body['image_url']
+
+
+def test_format_and_quality(server, client):
+    upload_id = upload(client, 'render-webp', (40, 50, 60))
+    body = predict(client, 'render-webp', upload_id, format='webp', quality=40).json
+    assert body['image_url'].endswith('.webp')
+    assert image_format(base64.b64decode(body['file'])) == 'WEBP'
+
+    # The cached prediction is re-encoded for a different format
+    body = predict(client, 'render-webp', upload_id, format='jpeg').json
+    assert body['image_url'].endswith('.jpg')
+    assert image_format(base64.b64decode(body['file'])) == 'JPEG'
+
+    response = predict(client, 'render-webp', upload_id, format='gif')
+    assert response.status_code == 400
+    assert 'format must be one of' in response.json['error']
+
+
+def test_image_0_renders_nothing(server, client, monkeypatch):
+    def no_rendering(*args):
+        raise AssertionError("rendered for ?image=0")
+    monkeypatch.setattr(server.renderer, 'submit', no_rendering)
+
+    upload_id = upload(client, 'render-none', (70, 80, 90))
+    body = predict(client, 'render-none', upload_id, image=0).json
+    assert 'file' not in body and 'image_url' not in body
+
+    [scan] = history(client, 'render-none')
+    assert scan['stage'] == body['stage']
+    assert 'image_url' not in scan and scan['image_data'] is None
+    assert client.get('/api/progress/render-none').json['scans'] == 1
+
+
+def test_cached_prediction_without_image_only_answers_image_0(server, client):
+    upload_id = upload(client, 'render-cache', (100, 110, 120))
+    hits, misses = server.cache_counts()['prediction']
+
+    predict(client, 'render-cache', upload_id, image=0)
+    predict(client, 'render-cache', upload_id, image=0)
+    assert server.cache_counts()['prediction'] == (hits + 1, misses + 1)
+
+    # There is no stored image to send, so the model runs again
+    body = predict(client, 'render-cache', upload_id).json
+    assert 'file' in body
+    assert server.cache_counts()['prediction'] == (hits + 1, misses + 2)
+    body = predict(client, 'render-cache', upload_id).json
+    assert 'file' in body
+    assert server.cache_counts()['prediction'] == (hits + 2, misses + 2)
+    assert client.get('/api/progress/render-cache').json['scans'] == 4
+
+
+def test_background_render_reaches_the_history(server, client):
+    upload_id = upload(client, 'render-later', (130, 140, 150))
+    body = predict(client, 'render-later', upload_id, image='background').json
+    assert 'file' not in body and 'image_url' not in body
+
+    deadline = time.monotonic() + 5
+    while not history(client, 'render-later') and time.monotonic() < deadline:
+        time.sleep(0.02)
+    [scan] = history(client, 'render-later')
+    assert client.get(scan['image_url']).status_code == 200
+
+
+def test_failed_background_render_still_records_the_scan(server, client, monkeypatch):
+    def broken_render(*args):
+        raise RuntimeError("plot failed")
+    monkeypatch.setattr(server, 'render_result', broken_render)
+
+    upload_id = upload(client, 'render-broken', (160, 170, 180))
+    body = predict(client, 'render-broken', upload_id, image='background').json
+
+    deadline = time.monotonic() + 5
+    while not history(client, 'render-broken') and time.monotonic() < deadline:
+        time.sleep(0.02)
+    [scan] = history(client, 'render-broken')
+    assert scan['stage'] == body['stage'] and scan['image_data'] is None
+
+
+def test_ready_once_the_model_is_loaded(server, client, monkeypatch):
+    import ultralytics
+
+    from model_registry import ModelRegistry
+
+    # A worker that hasn't loaded its model yet, with a load slow enough to observe
+    monkeypatch.setattr(ultralytics, 'LOAD_SECONDS', 0.3)
+    monkeypatch.setattr(server, 'model_registry', ModelRegistry(server.app.config['MODEL_PATH'], reload_interval=0))
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.json['ready'] is False and response.json['model_error'] is None
+
+    deadline = time.monotonic() + 5
+    while response.status_code == 503 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json['ready'] is True
+    assert response.json['startup']['model_load'] >= 0.3
+    assert client.get('/keep-alive').status_code == 200
+
+
+def test_ready_reports_a_failed_load(server, client, monkeypatch, tmp_path):
+    from model_registry import ModelRegistry
+
+    monkeypatch.setattr(server, 'model_registry', ModelRegistry(str(tmp_path / 'missing.pt'), reload_interval=0))
+    assert client.get('/ready').status_code == 503
+    server.model_registry._loader.join(5)
+    assert 'missing.pt' in server.model_registry.load_error
+
+    # Each probe retries the load, the worker stays out of rotation meanwhile
+    assert client.get('/ready').status_code == 503
@@ -1,4 +1,16 @@
-from server import app
+import os
+
+from server import app, model_registry
+
+# MODEL_PRELOAD=1 loads and warms up the model at import time. With
+# `gunicorn --preload wsgi:app` that happens once in the master before the
+# workers are forked (gunicorn.conf.py sets it when GUNICORN_PRELOAD=1).
+# Otherwise nothing is loaded here, this module may be imported in a master
+# that is about to fork. gunicorn.conf.py starts the background load in each
+# worker once it is running, /ready reports 503 until it is done, and other
+# servers load on the first /ready or predict request.
+if os.environ.get('MODEL_PRELOAD') == '1':
+    model_registry.load()
 
 if __name__ == "__main__":
     app.run()